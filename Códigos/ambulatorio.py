@@ -33,15 +33,49 @@
 import os                                           # Lidar com caminhos e arquivos do sistema
 import unicodedata                                  # Normalizar strings (ex: remover acentos)
 import pandas as pd                                 # Manipulação de planilhas e dados em tabelas
+import numpy as np
 import shutil                                       # Mover arquivos entre pastas
+import errno                                        # Detectar movimentação entre unidades (EXDEV)
+from concurrent.futures import ThreadPoolExecutor   # Mover vários arquivos em paralelo (I/O)
+from concurrent.futures import ProcessPoolExecutor  # Ler várias planilhas em paralelo (CPU)
 import re                                           # Expressões regulares
 import json
+import time
 import argparse
+import sys                                          # Leitura do modo lote do wizard (stdin até EOF)
+import atexit                                       # Garante a gravação dos logs pendentes ao sair
+import functools                                    # Cache de funções puras (lru_cache)
+from contextlib import contextmanager               # Agrupar gravações de abas do Excel
+import hashlib                                      # Hash do conteúdo das planilhas (cache de leitura)
 from openpyxl import load_workbook                  # Leitura e escrita em arquivos Excel (.xlsx)
-from fuzzywuzzy import process                      # Matching aproximado de texto (fuzzy matching)
+from rapidfuzz import process, fuzz, utils          # Matching aproximado de texto (fuzzy matching, em C++)
 from datetime import datetime
-from dateutil.relativedelta import relativedelta    # Manipular datas relativas (ex: mês anterior)
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# Leitura de .xlsx: usa o calamine (parser em Rust, bem mais rápido e econômico
+# em memória) quando estiver instalado; senão, mantém o openpyxl.
+# As gravações continuam sempre com openpyxl/xlsxwriter.
+try:
+    import python_calamine  # noqa: F401
+    READ_ENGINE = "calamine"
+except ImportError:
+    READ_ENGINE = "openpyxl"
+# Gravação com openpyxl: com o lxml instalado o openpyxl serializa o XML em C
+# (detecção automática); sem ele cai no xml.etree puro Python, bem mais lento.
+try:
+    import lxml  # noqa: F401
+    LXML_DISPONIVEL = True
+except ImportError:
+    LXML_DISPONIVEL = False
+# JSON da config: orjson (serialização em C) quando instalado; senão, json da stdlib.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import pyarrow as pa                                # Armazenamento colunar (Parquet) da base principal
+import pyarrow.parquet as pq
 
 # =========================
 # UI helpers (prompt/menus)
@@ -141,7 +175,7 @@ def _input_motivo_padrao() -> str:
 def _listar_especialidades_log_unicas() -> list[str]:
     """Lê o log de erros (ambulatorio_log) e retorna a lista única (ordenada) de especialidade_original."""
     try:
-        df_log = pd.read_excel(CAMINHO_LOGS, sheet_name="ambulatorio_log", engine="openpyxl")
+        df_log = ler_tabela_controle(CAMINHO_LOGS_PARQUET)
         if df_log.empty:
             return []
     except Exception:
@@ -153,13 +187,13 @@ def _listar_especialidades_log_unicas() -> list[str]:
         df_log[col]
         .astype(str)
         .fillna("")
-        .map(lambda s: s.strip())
+        .str.strip()
         .replace("", pd.NA)
         .dropna()
-        .unique()
-        .tolist()
+        .drop_duplicates()
     )
-    esp.sort(key=lambda s: unicodedata.normalize('NFKD', s).encode('ASCII', 'ignore').decode('utf-8').lower())
+    # ordena sem acento/minúsculas, normalizando a coluna de uma vez
+    esp = esp.iloc[normalizar_series(esp).argsort(kind="stable")].tolist()
     return esp
 
 def _atualizar_qualificacao_por_retificacao(ajustes: list[dict]):
@@ -168,18 +202,14 @@ def _atualizar_qualificacao_por_retificacao(ajustes: list[dict]):
       delta_linhas_logs, delta_linhas_base, delta_soma_logs, delta_soma_base.
     Se a linha não existir, cria com os deltas (demais campos 0). Recalcula status.
     """
+    flush_logs()            # linhas de Qualificação ainda em memória entram antes dos deltas
     garantir_quali_dados()  # <-- nome novo
 
     try:
-        dfq = pd.read_excel(CAMINHO_QUALI_DADOS, sheet_name=ABA_QUALI_AMB, engine="openpyxl")
+        dfq = ler_tabela_controle(CAMINHO_QUALI_PARQUET)
     except Exception:
         # estrutura mínima
-        dfq = pd.DataFrame(columns=[
-            "Data_Registro",
-            "arquivo","cnes","nome_hospital","competencia",
-            "linhas_raw","linhas_base","linhas_logs","status_linhas",
-            "soma_raw","soma_base","soma_logs","status_soma"
-        ])
+        dfq = pd.DataFrame(columns=_COLS_QUALI)
 
     def _recalcular_status(l_raw, l_base, l_logs, s_raw, s_base, s_logs):
         if l_logs > 0:
@@ -193,6 +223,8 @@ def _atualizar_qualificacao_por_retificacao(ajustes: list[dict]):
         status_soma = "OK" if s_raw == (s_base + s_logs) else "Divergente"
         return status_linhas, status_soma
 
+    novas_linhas = {}  # (arquivo, competencia) → linha ainda não existente na tabela
+    agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # um carimbo para todo o lote
     for a in ajustes:
         arquivo      = a["arquivo"]
         competencia  = a["competencia"]
@@ -233,10 +265,22 @@ def _atualizar_qualificacao_por_retificacao(ajustes: list[dict]):
             dfq.at[idx,"status_linhas"] = st_l
             dfq.at[idx,"status_soma"]   = st_s
 
+        elif (arquivo, competencia) in novas_linhas:
+            # já criada neste mesmo lote: só acumula os deltas
+            novo = novas_linhas[(arquivo, competencia)]
+            novo["linhas_base"] += d_lb
+            novo["linhas_logs"] += d_ll
+            novo["soma_base"]   += d_sb
+            novo["soma_logs"]   += d_sl
+            st_l, st_s = _recalcular_status(novo["linhas_raw"],novo["linhas_base"],novo["linhas_logs"],
+                                            novo["soma_raw"],novo["soma_base"],novo["soma_logs"])
+            novo["status_linhas"] = st_l
+            novo["status_soma"]   = st_s
+
         else:
             # cria nova linha com Data_Registro agora
             novo = {
-                "Data_Registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "Data_Registro": agora,
                 "arquivo": arquivo,
                 "cnes": cnes,
                 "nome_hospital": nome_hosp,
@@ -252,10 +296,13 @@ def _atualizar_qualificacao_por_retificacao(ajustes: list[dict]):
                                             novo["soma_raw"],novo["soma_base"],novo["soma_logs"])
             novo["status_linhas"] = st_l
             novo["status_soma"]   = st_s
-            dfq = pd.concat([dfq, pd.DataFrame([novo])], ignore_index=True)
+            novas_linhas[(arquivo, competencia)] = novo
+
+    # Linhas novas acumuladas como dicts e convertidas de uma vez (sem concat dentro do loop)
+    if novas_linhas:
+        dfq = pd.concat([dfq, pd.DataFrame(list(novas_linhas.values()))], ignore_index=True)
 
-    with pd.ExcelWriter(CAMINHO_QUALI_DADOS, engine="openpyxl", mode="a", if_sheet_exists="replace") as w:
-        dfq.to_excel(w, sheet_name=ABA_QUALI_AMB, index=False)
+    gravar_tabela_controle(CAMINHO_QUALI_PARQUET, dfq)
 
 
 # ===============================================================
@@ -275,9 +322,23 @@ os.makedirs(CONTROLE_DIR, exist_ok=True)
 # Formato: { cnes_str: { TERMO_UP: {"acao": "M"|"L", "destino": str|None, "motivo": str|None} } }
 decisoes_especialidades = {}
 
+# Detalha no terminal cada linha corrigida do log (--verbose); o resumo sai sempre
+VERBOSE = False
+
+# Reaproveita a aba já lida de uma planilha idêntica (mesmo conteúdo) em execuções seguintes (--no-cache desliga)
+USAR_CACHE_PLANILHAS = True
+
+# Leitura das planilhas em processos separados: só a partir de MIN_ARQUIVOS_PARALELO
+# planilhas fora do cache, com no máximo MAX_PROCESSOS_LEITURA processos
+MIN_ARQUIVOS_PARALELO = 4
+MAX_PROCESSOS_LEITURA = 4
+
 # Arquivo de configuração (mantido ao lado do script)
 CONFIG_PATH = os.path.join(SCRIPT_DIR, "ambulatorio_config.json")
 
+# Indica que há alterações de config em memória ainda não gravadas (ver flush_config)
+_CONFIG_PENDENTE = False
+
 # === ARQUIVOS DE CONTROLE (consolidados/reorganizados) ===
 
 # (NOVO) Só Qualificação (com Data_Registro) — arquivo e aba renomeados
@@ -287,6 +348,9 @@ ABA_QUALI_AMB = "Ambulatorio"  # antes: "Ambulatorial – Qualificação"
 # 2) Grade (formato da tabela por competência, igual ao print)
 CAMINHO_CONTROLE_ATUALIZACAO_GRADE = os.path.join(CONTROLE_DIR, "Controle de Atualização.xlsx")
 ABA_GRADE = "Ambulatorial – Grade"
+ABA_ENVIO = "Ambulatorial – Envio (6 meses)"  # evita conflito com "Ambulatorial – Grade"
+# Versão das entradas usadas na última gravação da aba Envio (pula regravações sem mudança)
+CAMINHO_MARCADOR_ENVIO = CAMINHO_CONTROLE_ATUALIZACAO_GRADE.replace(".xlsx", ".envio.json")
 
 # 3) Mudanças + Decisões manuais de registro → MESMO ARQUIVO
 CAMINHO_CONTROLE_MUD_REG = os.path.join(CONTROLE_DIR, "Controle de Mudanças e Registros.xlsx")
@@ -295,10 +359,41 @@ ABA_MUD_REG = "Ambulatório"
 # 4) Log de erros (especialidades/consultórios não reconhecidos)
 CAMINHO_LOGS = os.path.join(CONTROLE_DIR, "Log de Erros.xlsx")
 
+# Mestres em Parquet das tabelas de controle/log (uma pasta por tabela, um arquivo por
+# gravação); os .xlsx acima são exportados a partir deles
+CAMINHO_LOGS_PARQUET = CAMINHO_LOGS.replace(".xlsx", ".parquet")
+CAMINHO_MUD_REG_PARQUET = CAMINHO_CONTROLE_MUD_REG.replace(".xlsx", ".parquet")
+CAMINHO_QUALI_PARQUET = CAMINHO_QUALI_DADOS.replace(".xlsx", ".parquet")
+
+# parquet → (xlsx de exportação, aba)
+_TABELAS_CONTROLE = {
+    CAMINHO_LOGS_PARQUET:    (CAMINHO_LOGS, "ambulatorio_log"),
+    CAMINHO_MUD_REG_PARQUET: (CAMINHO_CONTROLE_MUD_REG, ABA_MUD_REG),
+    CAMINHO_QUALI_PARQUET:   (CAMINHO_QUALI_DADOS, ABA_QUALI_AMB),
+}
+_TABELAS_PENDENTES = set()  # tabelas alteradas desde a última exportação para o Excel
+MAX_PARTES_CONTROLE = 50    # acima disso, os arquivos de uma tabela são juntados num só
+
+# Colunas de contagem das tabelas de controle (as demais são gravadas como texto).
+# O "quantitativo" do log de erros fica como texto: é o valor bruto da planilha, que
+# pode não ser número; quem usa o valor converte com pd.to_numeric.
+_COLS_NUMERICAS_CONTROLE = {
+    "linhas_raw", "linhas_base", "linhas_logs",
+    "soma_raw", "soma_base", "soma_logs",
+}
+
+_COLS_QUALI = [
+    "Data_Registro",
+    "arquivo", "cnes", "nome_hospital", "competencia",
+    "linhas_raw", "linhas_base", "linhas_logs", "status_linhas",
+    "soma_raw", "soma_base", "soma_logs", "status_soma"
+]
+
 # === PASTAS DE PLANILHAS ===
 PLANILHAS_DIR = os.path.join(PRODUCAO_DIR, "Planilhas")
 CAMINHO_PLANILHAS = os.path.join(PLANILHAS_DIR, "A serem processadas")
 CAMINHO_ARQUIVADAS = os.path.join(PLANILHAS_DIR, "Processadas")
+CAMINHO_CACHE_PLANILHAS = os.path.join(PLANILHAS_DIR, ".cache")  # aba 'Ambulatorio' já lida (Parquet, só texto), por hash do arquivo
 
 # === BASE DE DADOS PRINCIPAL ===
 # (arquivo de fato utilizado para receber os dados válidos)
@@ -306,8 +401,248 @@ BASES_DIR = os.path.abspath(os.path.join(PRODUCAO_DIR, os.pardir, "Bases de Dado
 NOME_ARQUIVO_BASE = "dbProducao.xlsx"
 CAMINHO_BASE = os.path.join(BASES_DIR, NOME_ARQUIVO_BASE)
 
+# Armazenamento principal da aba de atendimentos: dataset Parquet particionado
+# por competência. Inserções apenas acrescentam arquivos novos (custo proporcional
+# às linhas novas); o .xlsx vira uma exportação para consulta/BI.
+CAMINHO_BASE_PARQUET = CAMINHO_BASE.replace(".xlsx", ".parquet")
+
 # Dicionário hospitalar (referência para CNES)
 CAMINHO_DHOSPITAIS = os.path.join(BASES_DIR, "dHospitais.xlsx")
+
+def _valor_celula(v):
+    """Converte um valor do DataFrame para célula openpyxl (NaN/NA/NaT viram célula vazia)."""
+    try:
+        if pd.isna(v):
+            return None
+    except (TypeError, ValueError):
+        return v
+    return v
+
+def _estilizar_cabecalho(cel):
+    """Cabeçalho no mesmo estilo do to_excel (negrito, borda fina, centralizado)."""
+    fino = Side(style="thin")
+    cel.font = Font(bold=True)
+    cel.border = Border(left=fino, right=fino, top=fino, bottom=fino)
+    cel.alignment = Alignment(horizontal="center", vertical="top")
+    return cel
+
+# Gravações adiadas dentro de gravacoes_em_lote(), uma fila por arquivo:
+# {caminho: {aba: ("substituir", df) | ("acrescentar", [registros])}}.
+# None = fora de um lote (cada gravação vai direto para o disco).
+_ABAS_ADIADAS = None
+# O que fazer depois de salvar cada arquivo do lote: {caminho: [(ao_concluir, ao_falhar)]}
+_APOS_GRAVAR_ADIADOS = None
+# Falhas do lote em andamento: [(caminho, erro)] (é a lista entregue pelo `with ... as`)
+_FALHAS_LOTE = None
+
+@contextmanager
+def gravacoes_em_lote():
+    """
+    Dentro do bloco, as trocas de aba (_substituir_aba_openpyxl) e os acréscimos de
+    linhas (_acrescentar_linhas_aba, _acrescentar_base_xlsx) só ficam anotados; ao sair,
+    cada arquivo é aberto e salvo uma única vez com tudo o que foi pedido para ele.
+    Várias trocas da mesma aba valem pela última. Blocos aninhados usam o lote externo.
+
+    `with gravacoes_em_lote() as falhas:` entrega a lista [(caminho, erro)] dos arquivos
+    que não puderam ser salvos; ela só fica completa depois do bloco. O que depende do
+    arquivo estar gravado vai em _apos_gravar() (roda só se o salvamento deu certo).
+    """
+    global _ABAS_ADIADAS, _APOS_GRAVAR_ADIADOS, _FALHAS_LOTE
+    if _ABAS_ADIADAS is not None:
+        yield _FALHAS_LOTE
+        return
+    _ABAS_ADIADAS, _APOS_GRAVAR_ADIADOS, _FALHAS_LOTE = {}, {}, []
+    falhas = _FALHAS_LOTE
+    try:
+        yield falhas
+    finally:
+        adiadas, apos = _ABAS_ADIADAS, _APOS_GRAVAR_ADIADOS
+        _ABAS_ADIADAS = _APOS_GRAVAR_ADIADOS = _FALHAS_LOTE = None
+        for caminho in dict.fromkeys([*adiadas, *apos]):
+            try:
+                if caminho in adiadas:
+                    _gravar_abas_openpyxl(caminho, adiadas[caminho])
+            except Exception as e:
+                print(f"❌ Erro ao gravar '{os.path.basename(caminho)}': {e}")
+                falhas.append((caminho, e))
+                for _, ao_falhar in apos.get(caminho, []):
+                    if ao_falhar is not None:
+                        ao_falhar()
+                continue
+            for ao_concluir, _ in apos.get(caminho, []):
+                ao_concluir()
+
+def _apos_gravar(caminho, ao_concluir, ao_falhar=None):
+    """
+    Agenda ao_concluir() para depois que `caminho` for salvo (ou ao_falhar(), se o
+    salvamento falhar). Fora de um lote a gravação já aconteceu: roda ao_concluir() já.
+    """
+    if _APOS_GRAVAR_ADIADOS is None:
+        ao_concluir()
+        return
+    _APOS_GRAVAR_ADIADOS.setdefault(caminho, []).append((ao_concluir, ao_falhar))
+
+def _gravar_ou_adiar(caminho, aba, operacao):
+    """
+    Fora de um lote grava já; dentro, põe a operação na fila do arquivo.
+    Acréscimo sobre uma aba que já vai ser trocada entra no próprio DataFrame da troca.
+    """
+    if _ABAS_ADIADAS is None:
+        _gravar_abas_openpyxl(caminho, {aba: operacao})
+        return
+    fila = _ABAS_ADIADAS.setdefault(caminho, {})
+    tipo, dados = operacao
+    if tipo == "acrescentar" and aba in fila:
+        tipo_ant, dados_ant = fila[aba]
+        if tipo_ant == "substituir":
+            operacao = ("substituir", pd.concat([dados_ant, pd.DataFrame(dados)], ignore_index=True))
+        else:
+            operacao = ("acrescentar", dados_ant + dados)
+    fila[aba] = operacao
+
+def _substituir_aba_openpyxl(caminho, aba, df):
+    """
+    Troca o conteúdo de uma aba preservando as demais abas do arquivo (cria o arquivo
+    se não existir). Dentro de gravacoes_em_lote() a gravação fica para o fim do lote.
+    """
+    _gravar_ou_adiar(caminho, aba, ("substituir", df))
+
+def _gravar_abas_openpyxl(caminho, abas):
+    """
+    Aplica as operações {aba: ("substituir", df) | ("acrescentar", registros)} num único
+    load/save do arquivo. Aba substituída é recriada na mesma posição e preenchida com
+    ws.append linha a linha (itertuples), sem o to_excel/ExcelWriter do pandas.
+    Arquivo novo é gerado em modo write_only (linhas vão direto para o XML).
+    """
+    novo = not os.path.exists(caminho)  # verifica a existência uma única vez
+    wb = Workbook(write_only=True) if novo else load_workbook(caminho)
+    for aba, (tipo, dados) in abas.items():
+        if tipo == "acrescentar":
+            if not novo and _acrescentar_registros_ws(wb, aba, dados):
+                continue
+            dados = pd.DataFrame(dados)  # aba inexistente ou sem cabeçalho → cria com os registros
+        df = dados
+        if novo:
+            ws = wb.create_sheet(aba)
+            ws.append([_estilizar_cabecalho(WriteOnlyCell(ws, value=str(c))) for c in df.columns])
+        else:
+            posicao = wb.sheetnames.index(aba) if aba in wb.sheetnames else len(wb.sheetnames)
+            if aba in wb.sheetnames:
+                del wb[aba]
+            ws = wb.create_sheet(aba, posicao)
+            ws.append([str(c) for c in df.columns])
+            for cel in ws[1]:
+                _estilizar_cabecalho(cel)
+
+        for linha in df.itertuples(index=False, name=None):
+            ws.append([_valor_celula(v) for v in linha])
+    wb.save(caminho)
+
+def _acrescentar_registros_ws(wb, aba, registros) -> bool:
+    """
+    Acrescenta registros (list de dicts) ao fim da aba já carregada, seguindo a ordem
+    do cabeçalho existente; colunas novas entram no fim do cabeçalho.
+    Retorna False se a aba não existe ou não tem cabeçalho.
+    """
+    ws = wb[aba] if aba in wb.sheetnames else None
+    cabecalho = [c.value for c in ws[1]] if ws is not None else []
+    if not any(v is not None for v in cabecalho):
+        return False
+    while cabecalho and cabecalho[-1] is None:
+        cabecalho.pop()
+    for registro in registros:
+        for col in registro:
+            if col not in cabecalho:
+                cabecalho.append(col)
+                _estilizar_cabecalho(ws.cell(row=1, column=len(cabecalho), value=col))
+    for registro in registros:
+        ws.append([_valor_celula(registro.get(col)) for col in cabecalho])
+    return True
+
+def _acrescentar_linhas_aba(caminho, aba, registros):
+    """
+    Acrescenta registros (list de dicts) ao fim de uma aba com ws.append, sem reler a
+    aba para um DataFrame nem regravá-la inteira. Arquivo ou aba inexistente (ou sem
+    cabeçalho) → cria a aba com os registros. Dentro de gravacoes_em_lote() entra na
+    fila do arquivo, junto com as trocas de aba.
+    """
+    _gravar_ou_adiar(caminho, aba, ("acrescentar", list(registros)))
+
+# --- Cache de leituras de .xlsx (invalidado pelo mtime do arquivo) ---
+@functools.lru_cache(maxsize=8)
+def _read_excel_cached(caminho: str, aba: str, mtime: float) -> pd.DataFrame:
+    """
+    Lê uma aba de hospitais uma única vez por versão do arquivo: o mtime entra na
+    chave do cache, então se o arquivo mudar no disco a próxima chamada relê.
+    Só as colunas usadas (A=CNES, D=Nome), já como texto: o resultado tem 2 colunas.
+    Quem for alterar o resultado deve trabalhar sobre uma cópia (.copy()).
+    """
+    return pd.read_excel(caminho, sheet_name=aba, engine=READ_ENGINE, usecols=[0, 3], dtype=str)
+
+@functools.lru_cache(maxsize=8)
+def _abas_xlsx_cached(caminho: str, mtime: float) -> tuple:
+    """Nomes das abas de um .xlsx (mesma regra de cache por mtime)."""
+    with pd.ExcelFile(caminho, engine=READ_ENGINE) as xls:
+        return tuple(xls.sheet_names)
+
+def _ler_aba_xlsx(caminho: str, aba: str) -> pd.DataFrame:
+    """
+    Lê só os valores de uma aba, sem montar o modelo completo da planilha:
+    calamine quando disponível; senão openpyxl em read_only, linha a linha.
+    Aba ou arquivo inexistente → DataFrame vazio, conferido pelos nomes das abas
+    (em cache por mtime) antes de ler: outros erros de leitura não são engolidos.
+    """
+    if not os.path.exists(caminho):
+        return pd.DataFrame()
+    if aba not in _abas_xlsx_cached(caminho, os.path.getmtime(caminho)):
+        return pd.DataFrame()
+    if READ_ENGINE == "calamine":
+        return pd.read_excel(caminho, sheet_name=aba, engine=READ_ENGINE)
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = wb[aba].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return pd.DataFrame()
+        return pd.DataFrame(list(linhas), columns=list(cabecalho))
+    finally:
+        wb.close()
+
+def _ler_dhospitais() -> pd.DataFrame:
+    """
+    Devolve (cópia) a aba de hospitais do dHospitais.xlsx: 'hospitais' se existir,
+    senão a primeira. O arquivo só é relido quando muda no disco.
+    Só as colunas CNES (col A) e Nome (col D), nessa ordem.
+    """
+    mtime = os.path.getmtime(CAMINHO_DHOSPITAIS)
+    abas = _abas_xlsx_cached(CAMINHO_DHOSPITAIS, mtime)
+    aba = next((s for s in abas if s.lower() == "hospitais"), abas[0])
+    return _read_excel_cached(CAMINHO_DHOSPITAIS, aba, mtime).copy()
+
+@functools.lru_cache(maxsize=4)
+def _indice_fuzzy_hospitais(caminho: str, aba: str, mtime: float) -> tuple:
+    """
+    (nomes UPPER, nomes pré-processados p/ rapidfuzz, CNES, posição de cada nome
+    pré-processado) de uma aba de hospitais (col A=CNES, col D=Nome).
+    Montado uma vez por versão do arquivo.
+    """
+    df = _read_excel_cached(caminho, aba, mtime)
+    nomes = df.iloc[:, 1].astype(str).str.strip().str.upper().tolist()
+    cnes = df.iloc[:, 0].astype(str).str.strip().tolist()
+    nomes_proc = [utils.default_process(n) for n in nomes]
+    exatos = {}
+    for i, n in enumerate(nomes_proc):
+        exatos.setdefault(n, i)  # primeira ocorrência, como o extractOne
+    return nomes, nomes_proc, cnes, exatos
+
+def _melhor_hospital(termo: str, nomes_proc: list, exatos: dict) -> tuple:
+    """(score, índice) do nome mais parecido; nome idêntico dispensa o fuzzy (score 100)."""
+    idx = exatos.get(termo)
+    if idx is not None:
+        return 100, idx
+    _, score, idx = process.extractOne(termo, nomes_proc, processor=None)
+    return round(score), idx
+
 # --- Helpers para normalização e nome oficial ---
 def _normalizar_cnes(cnes_raw: str) -> str:
     """Mantém apenas dígitos e preenche à esquerda para 7 dígitos (padrão CNES)."""
@@ -326,9 +661,7 @@ def _nome_oficial_por_cnes(cnes_norm: str) -> str | None:
         if _HOSP_CACHE is None:
             if not os.path.exists(CAMINHO_DHOSPITAIS):
                 return None
-            xls = pd.ExcelFile(CAMINHO_DHOSPITAIS, engine="openpyxl")
-            aba = "hospitais" if "hospitais" in [s.lower() for s in xls.sheet_names] else xls.sheet_names[0]
-            df = pd.read_excel(xls, sheet_name=aba, engine="openpyxl").iloc[:, [0, 3]].copy()
+            df = _ler_dhospitais()
             df.columns = ["cnes", "nome_hospital"]
             df["cnes"] = df["cnes"].map(_normalizar_cnes)
             df["nome_hospital"] = df["nome_hospital"].astype(str).str.strip().str.upper()
@@ -345,6 +678,27 @@ os.makedirs(BASES_DIR, exist_ok=True)
 NOME_ABA = "ambulatorioAtendimentos"
 NOME_ABA_2 = "ambulatorioConsultorios"
 
+# Colunas da aba de atendimentos (na ordem gravada na base)
+_BASE_COLS = [
+    "cnes", "competencia",
+    "especialidade_original",   # como veio na planilha
+    "especialidade",            # final (padronizada)
+    "quantitativo de atendimentos"
+]
+
+# Colunas usadas na detecção de duplicatas (projeção na leitura do Parquet)
+_CHAVE_BASE = ["cnes", "competencia", "especialidade", "quantitativo de atendimentos"]
+
+# Indica que o .xlsx da base está defasado em relação ao Parquet
+_BASE_XLSX_PENDENTE = False
+# Linhas inseridas desde a última exportação (acrescentadas à aba sem regravá-la)
+_BASE_XLSX_NOVAS = []
+
+# Registros de log/mudanças acumulados em memória até o próximo flush_logs()
+_PENDING_ERROS = []
+_PENDING_MUD_REG = []
+_PENDING_QUALI = []
+
 
 # Lista padrão de especialidades esperadas para matching
 lista_especialidades_ambulatorio = [
@@ -406,11 +760,88 @@ lista_especialidades_ambulatorio = [
     "Urologia",
 ]
 
+# Índice MAIÚSCULO → nome canônico da lista acima (atalho antes do fuzzy).
+# Reconstruído sempre que a lista muda (config, wizard ou mapeamento manual).
+_ESPECIALIDADES_UPPER: dict[str, str] = {}
+
+# Especialidades já pré-processadas para o fuzzy (minúsculas, sem pontuação), na ordem da lista
+_ESCOLHAS_FUZZY: list[str] = []
+
+# Resultados do fuzzy calculados em lote (cdist) por termo: nome canônico ou None.
+# Depende só da lista de especialidades; limpo junto com _ESCOLHAS_FUZZY.
+_FUZZY_LOTE: dict[str, str | None] = {}
+
+@functools.lru_cache(maxsize=4096)
+def _padronizar_cached(termo: str) -> str | None:
+    """
+    Parte "pura" da padronização (busca exata → substituição global → fuzzy ≥ 95),
+    memoizada por termo: o mesmo nome se repete em centenas de linhas.
+    Limpa (cache_clear) sempre que a lista, as políticas ou as substituições mudam.
+    """
+    termo_up = termo.upper()
+
+    # Já é uma especialidade conhecida (caso mais comum): busca exata, sem fuzzy
+    canon = _ESPECIALIDADES_UPPER.get(termo_up)
+    if canon is not None:
+        return canon
+
+    # Substituição global
+    substituida = _SUBSTITUICOES_UPPER.get(termo_up)
+    if substituida is not None:
+        return substituida
+
+    # Fuzzy “seguro” (já calculado em lote para os termos da planilha atual, se houver)
+    if termo in _FUZZY_LOTE:
+        return _FUZZY_LOTE[termo]
+    if lista_especialidades_ambulatorio:
+        # escolhas já pré-processadas; só o termo é processado aqui.
+        # score_cutoff (equivale a round(score) >= 95) deixa o rapidfuzz descartar cedo os candidatos fracos
+        achado = process.extractOne(utils.default_process(termo), _ESCOLHAS_FUZZY, processor=None, score_cutoff=94.5)
+        if achado is not None:
+            return lista_especialidades_ambulatorio[achado[2]]
+    return None
+
+def _atualizar_indice_especialidades():
+    """Reconstrói o índice de busca exata e as escolhas do fuzzy das especialidades conhecidas."""
+    _ESPECIALIDADES_UPPER.clear()
+    for esp in lista_especialidades_ambulatorio:
+        _ESPECIALIDADES_UPPER.setdefault(str(esp).strip().upper(), esp)
+    _ESCOLHAS_FUZZY[:] = [utils.default_process(str(esp)) for esp in lista_especialidades_ambulatorio]
+    _FUZZY_LOTE.clear()
+    _padronizar_cached.cache_clear()
+
+def _fuzzy_em_lote(termos):
+    """
+    Calcula de uma vez (process.cdist, em C e multithread) o fuzzy de todos os termos
+    distintos de uma planilha que ainda não têm resultado, guardando em _FUZZY_LOTE.
+    Mesmo critério do extractOne de _padronizar_cached (WRatio, corte 94.5, primeiro
+    melhor candidato). Termos com busca exata ou substituição global ficam de fora.
+    """
+    pendentes = []
+    for termo in dict.fromkeys(termos):
+        termo_up = termo.upper()
+        if termo in _FUZZY_LOTE or termo_up in _ESPECIALIDADES_UPPER or termo_up in _SUBSTITUICOES_UPPER:
+            continue
+        pendentes.append(termo)
+    if not pendentes or not _ESCOLHAS_FUZZY:
+        return
+
+    escores = process.cdist(
+        [utils.default_process(t) for t in pendentes], _ESCOLHAS_FUZZY,
+        scorer=fuzz.WRatio, processor=None, score_cutoff=94.5, dtype=np.float64, workers=-1,
+    )
+    melhores = escores.argmax(axis=1)
+    for termo, linha, idx in zip(pendentes, escores, melhores):
+        _FUZZY_LOTE[termo] = lista_especialidades_ambulatorio[idx] if linha[idx] >= 94.5 else None
+
+_atualizar_indice_especialidades()
+
 # Hospitais que não possuem ambulatório (exceções conhecidas)
-cnes_sem_ambulatorio = [
+# frozenset de CNES já em texto e sem espaços: o teste de pertinência não converte nada
+cnes_sem_ambulatorio = frozenset(str(c).strip() for c in [
     "161438",  
     "7638698",
-]
+])
 
 # Termos que devem ser ignorados no processamento (ex: funções administrativas)
 termos_proibidos = [
@@ -421,32 +852,47 @@ termos_proibidos = [
 
 substituicoes_especialidades = {}
 
+# Invariante: termos proibidos e origens das substituições ficam sempre em
+# MAIÚSCULO e sem espaços nas pontas (garantido na carga da config e na escrita).
+# Índices derivados das duas estruturas acima (consultados a cada termo lido):
+# frozenset para os termos proibidos e mapa de substituições.
+# Reconstruídos sempre que elas mudam (config, wizard ou mapeamento manual).
+_TERMOS_PROIBIDOS_SET: frozenset[str] = frozenset()
+_SUBSTITUICOES_UPPER: dict[str, str] = {}
+
+def _canonicalizar_politicas():
+    """Põe termos proibidos e origens das substituições na forma canônica (strip + MAIÚSCULO)."""
+    termos = list(dict.fromkeys(str(t).strip().upper() for t in termos_proibidos))
+    termos_proibidos[:] = [t for t in termos if t]
+    canon = {str(k).strip().upper(): v for k, v in substituicoes_especialidades.items()}
+    substituicoes_especialidades.clear()
+    substituicoes_especialidades.update(canon)
+
+def _atualizar_indices_politicas():
+    """Reconstrói os índices de termos proibidos e substituições."""
+    global _TERMOS_PROIBIDOS_SET
+    _TERMOS_PROIBIDOS_SET = frozenset(termos_proibidos)
+    _SUBSTITUICOES_UPPER.clear()
+    _SUBSTITUICOES_UPPER.update(substituicoes_especialidades)
+    _padronizar_cached.cache_clear()
+
+_atualizar_indices_politicas()
+
 # Flags auxiliares de interação
 ULTIMA_RESOLUCAO_TEXTO = None   # preenchida quando usuário escolhe correção manual (M)
 ULTIMO_MOTIVO_ERRO = None       # preenchida quando usuário escolhe mandar pro log (L)
+MOTIVO_CANCELADO = "Operação cancelada pelo usuário"  # motivo de quem cancela (Q): não é memorizado
+MOTIVO_QTD_NAO_NUMERICO = "Quantitativo não numérico"  # ex.: "-" na coluna D da planilha
 
 def garantir_quali_dados():
-    """Garante o arquivo 'Qualificação de Dados.xlsx' com a aba 'Ambulatorio'."""
-    os.makedirs(CONTROLE_DIR, exist_ok=True)
-    precisa_criar = not os.path.exists(CAMINHO_QUALI_DADOS)
+    """
+    Garante a tabela de Qualificação (Parquet). Se só existir o antigo
+    'Qualificação de Dados.xlsx', ele é migrado na primeira leitura.
+    """
+    precisa_criar = not os.path.exists(CAMINHO_QUALI_PARQUET) and not os.path.exists(CAMINHO_QUALI_DADOS)
     if precisa_criar:
-        with pd.ExcelWriter(CAMINHO_QUALI_DADOS, engine="openpyxl", mode="w") as w:
-            pd.DataFrame(columns=[
-                "Data_Registro",
-                "arquivo",
-                "cnes",
-                "nome_hospital",
-                "competencia",
-                "linhas_raw",
-                "linhas_base",
-                "linhas_logs",
-                "status_linhas",
-                "soma_raw",
-                "soma_base",
-                "soma_logs",
-                "status_soma"
-            ]).to_excel(w, sheet_name=ABA_QUALI_AMB, index=False)
-        print(f"📄 Criado '{CAMINHO_QUALI_DADOS}' com a aba '{ABA_QUALI_AMB}'.")
+        gravar_tabela_controle(CAMINHO_QUALI_PARQUET, pd.DataFrame(columns=_COLS_QUALI))
+        print(f"📄 Criada a tabela de Qualificação em '{CAMINHO_QUALI_PARQUET}'.")
 
 
 def _mm_aaaa(comp_yyyy_mm: str) -> str:
@@ -460,19 +906,23 @@ def _mm_aaaa(comp_yyyy_mm: str) -> str:
 def _garantir_grade_vazia():
     cols = ["CNES", "Hospital"]  # meses serão adicionados on-demand
     df = pd.DataFrame(columns=cols)
-    with pd.ExcelWriter(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, engine="openpyxl", mode="w") as w:
-        df.to_excel(w, sheet_name=ABA_GRADE, index=False)
+    # arquivo recriado do zero (também quando existe mas a aba está ilegível)
+    if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE):
+        os.remove(CAMINHO_CONTROLE_ATUALIZACAO_GRADE)
+    _substituir_aba_openpyxl(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, ABA_GRADE, df)
     print(f"📄 Criado '{CAMINHO_CONTROLE_ATUALIZACAO_GRADE}' com a aba '{ABA_GRADE}'.")
 
 def garantir_controle_atualizacao_grade():
-    os.makedirs(CONTROLE_DIR, exist_ok=True)
     if not os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE):
         _garantir_grade_vazia()
     else:
-        # garante que a aba exista
+        # garante que a aba exista (só os nomes das abas, sem ler o conteúdo)
         try:
-            pd.read_excel(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, sheet_name=ABA_GRADE, engine="openpyxl")
+            abas = _abas_xlsx_cached(CAMINHO_CONTROLE_ATUALIZACAO_GRADE,
+                                     os.path.getmtime(CAMINHO_CONTROLE_ATUALIZACAO_GRADE))
         except Exception:
+            abas = ()
+        if ABA_GRADE not in abas:
             _garantir_grade_vazia()
 
 def atualizar_controle_atualizacao_grade(*_args, **_kwargs):
@@ -488,46 +938,40 @@ def atualizar_controle_atualizacao_grade(*_args, **_kwargs):
         if not os.path.exists(CAMINHO_DHOSPITAIS):
             print(f"⚠️ dHospitais.xlsx não encontrado em: {CAMINHO_DHOSPITAIS}")
             return
-        xls = pd.ExcelFile(CAMINHO_DHOSPITAIS, engine="openpyxl")
-        aba = "hospitais" if "hospitais" in [s.lower() for s in xls.sheet_names] else xls.sheet_names[0]
-        df_hosp = pd.read_excel(xls, sheet_name=aba, engine="openpyxl").iloc[:, [0, 3]].copy()
+        df_hosp = _ler_dhospitais()
         df_hosp.columns = ["CNES", "Hospital"]
         df_hosp["CNES"] = df_hosp["CNES"].astype(str).str.strip()
         df_hosp["Hospital"] = df_hosp["Hospital"].astype(str).str.strip().str.upper()
 
-        # Base de produção (ambulatorio)
-        if not os.path.exists(CAMINHO_BASE):
-            print(f"ℹ️ Base '{CAMINHO_BASE}' não existe ainda; criando grade vazia.")
-            df_out = df_hosp.copy()
-            with pd.ExcelWriter(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, engine="openpyxl",
-                                mode=("a" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else "w"),
-                                if_sheet_exists=("replace" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else None)) as w:
-                df_out.to_excel(w, sheet_name=ABA_GRADE, index=False)
-            return
-
-        df_base = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA, engine="openpyxl")
+        # Base de produção (ambulatorio) — apenas as colunas usadas na grade
+        df_base = ler_base_ambulatorio(["cnes", "competencia"])
         if df_base.empty:
+            print(f"ℹ️ Base '{NOME_ABA}' ainda vazia; criando grade sem competências.")
             df_out = df_hosp.copy()
-            with pd.ExcelWriter(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, engine="openpyxl",
-                                mode=("a" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else "w"),
-                                if_sheet_exists=("replace" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else None)) as w:
-                df_out.to_excel(w, sheet_name=ABA_GRADE, index=False)
+            _substituir_aba_openpyxl(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, ABA_GRADE, df_out)
             return
 
-        df_base["cnes"] = df_base["cnes"].astype(str).str.strip()
-        df_base["competencia"] = df_base["competencia"].astype(str).str.strip()
+        # cnes como categoria com o dicionário dos hospitais (fora de dHospitais → vazio) e
+        # competência como categoria: a agregação abaixo agrupa por códigos inteiros
+        tipo_cnes = pd.CategoricalDtype(df_hosp["CNES"].dropna().unique())
+        df_base["cnes"] = df_base["cnes"].astype(str).str.strip().astype(tipo_cnes)
+        df_base["competencia"] = df_base["competencia"].astype(str).str.strip().astype("category")
 
-        # Competências únicas, ordenadas (YYYY-MM)
-        comps = sorted(set(df_base["competencia"]), key=lambda s: s if re.match(r"^\d{4}-\d{2}$", s) else f"9999-99")
+        # Competências únicas (as categorias), ordenadas (YYYY-MM)
+        comps = sorted(df_base["competencia"].cat.categories, key=lambda s: s if re.match(r"^\d{4}-\d{2}$", s) else f"9999-99")
         # Colunas MM-YYYY
         cols_mes = [f"{c.split('-')[1]}-{c.split('-')[0]}" if re.match(r"^\d{4}-\d{2}$", c) else c for c in comps]
 
-        # Monta grade ✅/❌
+        # Presença (cnes x competência) numa única agregação, alinhada às linhas da grade
+        presenca = (
+            pd.crosstab(df_base["cnes"], df_base["competencia"]).gt(0)
+            .reindex(index=pd.Index(df_hosp["CNES"]), columns=pd.Index(comps), fill_value=False)
+        )
+
+        # Monta grade ✅/❌ (textos só no último passo, em bloco)
         df_out = df_hosp.copy()
-        for comp_iso, col in zip(comps, cols_mes):
-            mask_comp = df_base["competencia"] == comp_iso
-            cnes_ok = set(df_base.loc[mask_comp, "cnes"].astype(str))
-            df_out[col] = ["✅" if str(c) in cnes_ok else "❌" for c in df_out["CNES"].astype(str)]
+        status = np.where(presenca.to_numpy(dtype=bool), "✅", "❌")
+        df_out = pd.concat([df_out, pd.DataFrame(status, columns=cols_mes, index=df_out.index)], axis=1)
 
         # Ordena colunas: CNES, Hospital, depois meses por ano+mês
         def _key(colname: str):
@@ -541,10 +985,7 @@ def atualizar_controle_atualizacao_grade(*_args, **_kwargs):
 
         df_out = df_out[sorted(df_out.columns, key=_key)]
 
-        with pd.ExcelWriter(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, engine="openpyxl",
-                            mode=("a" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else "w"),
-                            if_sheet_exists=("replace" if os.path.exists(CAMINHO_CONTROLE_ATUALIZACAO_GRADE) else None)) as w:
-            df_out.to_excel(w, sheet_name=ABA_GRADE, index=False)
+        _substituir_aba_openpyxl(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, ABA_GRADE, df_out)
 
         print(f"✅ Grade atualizada (estilo ✅/❌) com {len(df_out)} hospitais e {len(cols_mes)} competências.")
 
@@ -557,17 +998,27 @@ def atualizar_controle_atualizacao_grade(*_args, **_kwargs):
 # ===============================================================
 
 
+@functools.lru_cache(maxsize=8192)
+def _chave_cnes_decisao(cnes) -> str:
+    """Chave de CNES em decisoes_especialidades (memoizada: o mesmo CNES se repete na planilha toda)."""
+    return str(cnes).strip()
+
+@functools.lru_cache(maxsize=8192)
+def _chave_termo_decisao(termo) -> str:
+    """Chave de termo (UPPER) em decisoes_especialidades, memoizada."""
+    return str(termo).strip().upper()
+
 def _get_decisao(cnes: str, termo_up: str):
-    cnes = str(cnes).strip()
-    termo_up = str(termo_up).strip().upper()
+    cnes = _chave_cnes_decisao(cnes)
+    termo_up = _chave_termo_decisao(termo_up)
     return (decisoes_especialidades.get(cnes) or {}).get(termo_up)
 
 def _set_decisao(cnes: str, termo_up: str, acao: str, destino: str | None, motivo: str | None):
-    cnes = str(cnes).strip()
-    termo_up = str(termo_up).strip().upper()
+    cnes = _chave_cnes_decisao(cnes)
+    termo_up = _chave_termo_decisao(termo_up)
     decisoes_especialidades.setdefault(cnes, {})
     decisoes_especialidades[cnes][termo_up] = {"acao": acao, "destino": destino, "motivo": motivo}
-    salvar_config()  # persiste imediatamente
+    _marcar_config_pendente()  # gravada em lote por flush_config()
 
 def carregar_config():
     """
@@ -575,12 +1026,14 @@ def carregar_config():
     """
     try:
         if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
+            with open(CONFIG_PATH, "rb") as f:
+                bruto = f.read()
+            cfg = orjson.loads(bruto) if orjson is not None else json.loads(bruto)
 
             if isinstance(cfg.get("lista_especialidades_ambulatorio"), list):
                 lista_especialidades_ambulatorio.clear()
                 lista_especialidades_ambulatorio.extend(cfg["lista_especialidades_ambulatorio"])
+                _atualizar_indice_especialidades()
 
             if isinstance(cfg.get("termos_proibidos"), list):
                 termos_proibidos.clear()
@@ -594,20 +1047,131 @@ def carregar_config():
                 decisoes_especialidades.clear()
                 decisoes_especialidades.update(cfg["decisoes_especialidades"])
 
+            # chaves canônicas uma única vez na carga; as consultas não normalizam de novo
+            _canonicalizar_politicas()
+            _atualizar_indices_politicas()
+
             print(f"⚙️ Config carregada de {CONFIG_PATH}.")
         else:
             print("ℹ️ Nenhum config JSON encontrado; usando valores padrão.")
     except Exception as e:
         print(f"❌ Erro ao carregar config: {e}")
 
+# --- Operações de edição da config (usadas pelo wizard interativo e pelo modo lote) ---
+def _cfg_add_especialidade(valor: str) -> bool:
+    valor = valor.strip()
+    if valor and valor not in lista_especialidades_ambulatorio:
+        lista_especialidades_ambulatorio.append(valor)
+        return True
+    return False
+
+def _cfg_rem_especialidade(valor: str) -> bool:
+    valor = valor.strip()
+    if valor in lista_especialidades_ambulatorio:
+        lista_especialidades_ambulatorio.remove(valor)
+        return True
+    return False
+
+def _cfg_add_proibido(valor: str) -> bool:
+    valor = valor.strip().upper()
+    if valor and valor not in termos_proibidos:
+        termos_proibidos.append(valor)
+        return True
+    return False
+
+def _cfg_rem_proibido(valor: str) -> bool:
+    valor = valor.strip().upper()
+    if valor in termos_proibidos:
+        termos_proibidos.remove(valor)
+        return True
+    return False
+
+def _remover_variantes_substituicao(origem_up: str) -> bool:
+    """Tira a origem do mapa (as chaves já estão em MAIÚSCULO, uma por termo)."""
+    return substituicoes_especialidades.pop(origem_up, None) is not None
+
+def _cfg_add_substituicao(origem: str, destino: str) -> bool:
+    origem, destino = origem.strip(), destino.strip()
+    if not (origem and destino):
+        return False
+    # origem sempre em UPPER (como faz o mapeamento manual): uma chave por termo
+    origem_up = origem.upper()
+    _remover_variantes_substituicao(origem_up)
+    substituicoes_especialidades[origem_up] = destino
+    _SUBSTITUICOES_UPPER[origem_up] = destino  # visão UPPER acompanha o mapa
+    _padronizar_cached.cache_clear()
+    # se destino for novo, adiciona à lista de especialidades
+    if destino not in lista_especialidades_ambulatorio:
+        lista_especialidades_ambulatorio.append(destino)
+    return True
+
+def _cfg_rem_substituicao(origem: str) -> bool:
+    origem_up = origem.strip().upper()
+    if _remover_variantes_substituicao(origem_up):
+        _SUBSTITUICOES_UPPER.pop(origem_up, None)
+        _padronizar_cached.cache_clear()
+        return True
+    return False
+
+def _cfg_add_substituicao_lote(valor: str) -> bool:
+    origem, sep, destino = valor.partition("=>")
+    return bool(sep) and _cfg_add_substituicao(origem, destino)
+
+# (operação, tipo) → função; cada linha do lote é "operação:tipo:valor"
+_OPERACOES_CONFIG_LOTE = {
+    ("add", "especialidade"): _cfg_add_especialidade,
+    ("rem", "especialidade"): _cfg_rem_especialidade,
+    ("add", "proibido"): _cfg_add_proibido,
+    ("rem", "proibido"): _cfg_rem_proibido,
+    ("add", "substituicao"): _cfg_add_substituicao_lote,
+    ("rem", "substituicao"): _cfg_rem_substituicao,
+}
+
+def _aplicar_config_em_lote(texto: str) -> tuple[int, list[str]]:
+    """
+    Aplica um bloco colado de diretivas, uma por linha:
+        add:especialidade:Cardiologia
+        rem:proibido:TERMO
+        add:substituicao:ORIGEM=>Destino
+    Linhas vazias e iniciadas por '#' são ignoradas.
+    Retorna (nº de alterações, linhas não reconhecidas).
+    """
+    alteracoes, invalidas = 0, []
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        partes = linha.split(":", 2)
+        func = _OPERACOES_CONFIG_LOTE.get(tuple(p.strip().lower() for p in partes[:2])) if len(partes) == 3 else None
+        if func is None:
+            invalidas.append(linha)
+            continue
+        alteracoes += func(partes[2])
+    return alteracoes, invalidas
+
+def _editar_config_em_lote():
+    """Lê todas as diretivas do stdin de uma vez (até EOF) e aplica."""
+    print("Cole as diretivas (operação:tipo:valor), uma por linha.")
+    print("Tipos: especialidade, proibido, substituicao (valor 'ORIGEM=>Destino').")
+    print("Finalize com Ctrl+D (Linux/macOS) ou Ctrl+Z e Enter (Windows).\n")
+    alteracoes, invalidas = _aplicar_config_em_lote(sys.stdin.read())
+    for linha in invalidas:
+        print(f"⚠️ Diretiva não reconhecida (ignorada): {linha}")
+    print(f"✔️ {alteracoes} alteração(ões) aplicada(s) em lote.")
+
 def wizard_editar_config_interativo():
     """
     Wizard simples no terminal para permitir adicionar/remover
     especialidades, termos proibidos e mapeamentos de substituição.
+    Também aceita um modo lote: várias diretivas coladas de uma vez.
     """
-    global lista_especialidades_ambulatorio, termos_proibidos, substituicoes_especialidades
-
     print("\n=== MODO EDIÇÃO DE CONFIG (INTERATIVO) ===")
+    modo = input("[L] Colar alterações em lote, [Enter] para o modo interativo: ").strip().lower()
+    if modo == "l":
+        _editar_config_em_lote()
+        _salvar_edicao_config()
+        return
+
     print("Você pode adicionar/remover itens. Deixe em branco para pular.\n")
 
     # 1) Especialidades
@@ -615,14 +1179,10 @@ def wizard_editar_config_interativo():
     while True:
         acao = input("Especialidades — [A]dicionar, [R]emover, [Enter] para continuar: ").strip().lower()
         if acao == "a":
-            novo = input("Digite a especialidade a adicionar: ").strip()
-            if novo and novo not in lista_especialidades_ambulatorio:
-                lista_especialidades_ambulatorio.append(novo)
+            if _cfg_add_especialidade(input("Digite a especialidade a adicionar: ")):
                 print("✔️ Adicionada.")
         elif acao == "r":
-            rem = input("Digite a especialidade a remover: ").strip()
-            if rem in lista_especialidades_ambulatorio:
-                lista_especialidades_ambulatorio.remove(rem)
+            if _cfg_rem_especialidade(input("Digite a especialidade a remover: ")):
                 print("🗑️ Removida.")
         else:
             break
@@ -632,14 +1192,10 @@ def wizard_editar_config_interativo():
     while True:
         acao = input("Termos proibidos — [A]dicionar, [R]emover, [Enter] para continuar: ").strip().lower()
         if acao == "a":
-            novo = input("Digite o termo a adicionar (use a grafia exata que vem na planilha): ").strip().upper()
-            if novo and novo not in termos_proibidos:
-                termos_proibidos.append(novo)
+            if _cfg_add_proibido(input("Digite o termo a adicionar (use a grafia exata que vem na planilha): ")):
                 print("✔️ Adicionado.")
         elif acao == "r":
-            rem = input("Digite o termo a remover: ").strip().upper()
-            if rem in termos_proibidos:
-                termos_proibidos.remove(rem)
+            if _cfg_rem_proibido(input("Digite o termo a remover: ")):
                 print("🗑️ Removido.")
         else:
             break
@@ -649,30 +1205,32 @@ def wizard_editar_config_interativo():
     while True:
         acao = input("Substituições — [A]dicionar/atualizar, [R]emover, [Enter] para finalizar: ").strip().lower()
         if acao == "a":
-            origem = input("Origem (como vem na planilha): ").strip()
-            destino = input("Destino padronizado: ").strip()
-            if origem and destino:
-                substituicoes_especialidades[origem] = destino
-                # se destino for novo, adiciona à lista de especialidades
-                if destino not in lista_especialidades_ambulatorio:
-                    lista_especialidades_ambulatorio.append(destino)
+            origem = input("Origem (como vem na planilha): ")
+            destino = input("Destino padronizado: ")
+            if _cfg_add_substituicao(origem, destino):
                 print("✔️ Substituição registrada.")
         elif acao == "r":
-            origem = input("Qual 'origem' deseja remover do mapa? ").strip()
-            if origem in substituicoes_especialidades:
-                del substituicoes_especialidades[origem]
+            if _cfg_rem_substituicao(input("Qual 'origem' deseja remover do mapa? ")):
                 print("🗑️ Removida.")
         else:
             break
 
-    # Salva tudo que foi feito
-    salvar_config()
+    _salvar_edicao_config()
+
+def _salvar_edicao_config():
+    """Reconstrói os índices e grava a config uma única vez ao fim da edição."""
+    _atualizar_indice_especialidades()
+    _atualizar_indices_politicas()
+    _marcar_config_pendente()
+    flush_config()
     print("✅ Edição concluída.\n")
 
 def salvar_config():
     """
     Grava o estado atual das estruturas em JSON (apenas 1 vez).
+    Escreve num .tmp e troca com os.replace: o JSON nunca fica pela metade.
     """
+    global _CONFIG_PENDENTE
     try:
         cfg = {
             "lista_especialidades_ambulatorio": lista_especialidades_ambulatorio,
@@ -680,19 +1238,84 @@ def salvar_config():
             "substituicoes_especialidades": substituicoes_especialidades,
             "decisoes_especialidades": decisoes_especialidades,
         }
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            dados = orjson.dumps(cfg, option=orjson.OPT_INDENT_2)
+        else:
+            dados = json.dumps(cfg, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp = CONFIG_PATH + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(dados)
+        os.replace(tmp, CONFIG_PATH)
+        _CONFIG_PENDENTE = False
         print(f"💾 Config salva em {CONFIG_PATH}.")
     except Exception as e:
         print(f"❌ Erro ao salvar config: {e}")
 
+def _marcar_config_pendente():
+    """Registra que a config em memória mudou; a gravação fica para flush_config()."""
+    global _CONFIG_PENDENTE
+    _CONFIG_PENDENTE = True
+
+def flush_config():
+    """
+    Grava a config somente se houve alteração desde a última gravação.
+    """
+    if _CONFIG_PENDENTE:
+        salvar_config()
+
+# Decisões tomadas durante um processamento interrompido também são preservadas
+atexit.register(flush_config)
+
+# Acentos do português → letra sem acento (tabela montada uma vez, usada com str.translate)
+_TABELA_ACENTOS = str.maketrans(
+    "áàãâäéèêëíìîïóòõôöúùûüçñÁÀÃÂÄÉÈÊËÍÌÎÏÓÒÕÔÖÚÙÛÜÇÑ",
+    "aaaaaeeeeiiiiooooouuuucnAAAAAEEEEIIIIOOOOOUUUUCN",
+)
+
+@functools.lru_cache(maxsize=4096)
 def normalizar(texto):
     """
     Remove acentos e transforma em minúsculas para facilitar comparações.
+    Memoizada: os mesmos nomes de aba se repetem em praticamente todos os arquivos.
     """
-    texto_sem_acentos = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+    texto_sem_acentos = texto.translate(_TABELA_ACENTOS)
+    if not texto_sem_acentos.isascii():
+        # caractere fora da tabela (ex.: º, ligaduras): decomposição completa
+        texto_sem_acentos = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
     return texto_sem_acentos.lower().strip()
 
+def normalizar_series(s: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de normalizar() para colunas inteiras (acessor .str do pandas).
+    """
+    return (
+        s.astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("utf-8")
+        .str.lower()
+        .str.strip()
+    )
+
+# Separador do "Mês Referente" ("maio, 2025"): vírgula com os espaços ao redor
+_MES_REF_SPLIT = re.compile(r"\s*,\s*")
+
+def _competencia_mes_referente(valor, competencia_padrao: str) -> str:
+    """
+    Competência (YYYY-MM) de uma célula "Mês Referente" no formato "maio, 2025";
+    se não der para interpretar, fica a competência do nome do arquivo.
+    """
+    try:
+        mes_raw = str(valor)
+        if "," in mes_raw:
+            nome_mes, ano = _MES_REF_SPLIT.split(mes_raw.strip())
+            mes_num = mes_para_numero(nome_mes)
+            if mes_num:
+                return f"{ano}-{mes_num}"
+    except Exception as e:
+        print(f"⚠️ Erro ao interpretar mês referente na linha: {e}")
+    return competencia_padrao
+
 def mes_para_numero(mes_extenso):
     """
     Converte o nome do mês (ex: "maio") para número ("05")
@@ -764,6 +1387,8 @@ def executar_retificacao():
     Retificação de dados pendentes:
       - [1] Retificar uma especialidade
       (novas opções poderão ser adicionadas aqui)
+    Base e controles vão para o Excel uma única vez, ao sair do menu
+    (cada retificação grava apenas no Parquet).
     """
     while True:
         os.system("cls" if os.name == "nt" else "clear")
@@ -775,6 +1400,8 @@ def executar_retificacao():
         print("  [0] Voltar\n")
         esc = _ask("→ Sua escolha: ").strip()
         if esc == "0":
+            exportar_base_xlsx()
+            exportar_controles_xlsx()
             return
         if esc == "1":
             retificar_uma_especialidade()
@@ -787,30 +1414,47 @@ def executar_processamento():
     print(_title("\n▶ Processamento de planilhas novas"))
     df_dados, arquivos_lidos, linhas_invalidas, consultorios_extraidos, erros_consultorios = ler_planilhas_ambulatorio()
 
+    # A base é lida uma vez e acompanha as inserções desta execução
+    df_base = carregar_base_existente()
     if df_dados.empty:
         print(_warn("Nenhum dado válido encontrado nas planilhas."))
     else:
-        df_base = carregar_base_existente()
         df_para_inserir = remover_duplicatas(df_dados, df_base)
         inserir_novos_dados(df_para_inserir)
+        df_base = pd.concat([df_base, df_para_inserir[_CHAVE_BASE]], ignore_index=True)
 
     registrar_erros_ambulatorio(linhas_invalidas)
-    processar_log_de_erros()
-    atualizar_aba_controle()
+    df_do_log = processar_log_de_erros(df_base)
+    df_base = pd.concat([df_base, df_do_log[_CHAVE_BASE]], ignore_index=True)
 
-    if arquivos_lidos:
-        mover_arquivos_processados(arquivos_lidos)
+    # Abas do mesmo arquivo (base + consultórios, Envio + Grade) saem num único salvamento
+    with gravacoes_em_lote() as falhas:
+        exportar_base_xlsx()
+        exportar_controles_xlsx()
+        atualizar_aba_controle(df_base)
 
-    # Inserção de consultórios (aba db_ambulatorio2)
-    if consultorios_extraidos:
-        df_cons = pd.DataFrame(consultorios_extraidos)
-        if not df_cons.empty:
-            inserir_consultorios(df_cons)
+        # Grade global: uma reconstrução por processamento (não mais uma por arquivo)
+        try:
+            atualizar_controle_atualizacao_grade()
+        except Exception as e:
+            print(f"❌ Erro ao atualizar grade de controle: {e}")
+
+        # Inserção de consultórios (aba db_ambulatorio2)
+        if consultorios_extraidos:
+            inserir_consultorios(pd.DataFrame(consultorios_extraidos))
             # Erros de consultórios
             if erros_consultorios:
                 registrar_erros_consultorios(erros_consultorios)
 
-    print(_ok("✔ Processamento concluído.\n"))
+    flush_config()
+    if falhas:
+        # planilhas ficam na pasta de entrada até os arquivos de saída serem gravados
+        print(_err(f"✖ {len(falhas)} arquivo(s) não foram gravados (aberto(s) no Excel?); "
+                   "as planilhas lidas continuam em 'A serem processadas'.\n"))
+    else:
+        if arquivos_lidos:
+            mover_arquivos_processados(arquivos_lidos)
+        print(_ok("✔ Processamento concluído.\n"))
     input(_muted("Pressione Enter para voltar ao menu... "))
 
 def executar_edicao_parametrizacoes():
@@ -829,11 +1473,11 @@ def wizard_renomear_na_base():
 
     # Carrega base
     try:
-        df = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA, engine="openpyxl")
-    except FileNotFoundError:
-        print(_err("Base não encontrada. Execute um processamento primeiro para criar a base."))
-        input(_muted("Pressione Enter para voltar ao menu... "))
-        return
+        df = ler_base_ambulatorio()
+        if df.empty:
+            print(_err("Base não encontrada. Execute um processamento primeiro para criar a base."))
+            input(_muted("Pressione Enter para voltar ao menu... "))
+            return
     except Exception as e:
         print(_err(f"Erro ao ler a base: {e}"))
         input(_muted("Pressione Enter para voltar ao menu... "))
@@ -867,8 +1511,17 @@ def wizard_renomear_na_base():
         input(_muted("Pressione Enter para voltar ao menu... "))
         return
 
-    # Prévia
-    mask = df[coluna].astype(str) == termo_de
+    # Prévia (compara no tipo da própria coluna, sem convertê-la inteira para str)
+    col = df[coluna]
+    if pd.api.types.is_string_dtype(col) and col.dtype != object:
+        mask = col.eq(termo_de).fillna(False).astype(bool)
+    elif pd.api.types.is_numeric_dtype(col):
+        try:
+            mask = col.eq(pd.to_numeric(termo_de)).fillna(False).astype(bool)
+        except (ValueError, TypeError):
+            mask = pd.Series(False, index=col.index)
+    else:
+        mask = col.astype(str) == termo_de  # object misto: mantém a comparação textual
     qtd = int(mask.sum())
     if qtd == 0:
         print(_warn(f"Nenhuma ocorrência de '{termo_de}' encontrada na coluna '{coluna}'."))
@@ -882,11 +1535,11 @@ def wizard_renomear_na_base():
         input(_muted("Pressione Enter para voltar ao menu... "))
         return
 
-    # Aplica e salva
-    df.loc[mask, coluna] = termo_para
+    # Aplica e salva (a coluna nova é montada de uma vez)
+    df[coluna] = col.mask(mask, termo_para)
     try:
-        with pd.ExcelWriter(CAMINHO_BASE, engine="openpyxl", mode="a", if_sheet_exists="replace") as w:
-            df.to_excel(w, sheet_name=NOME_ABA, index=False)
+        _gravar_base_parquet(df, substituir=True)
+        exportar_base_xlsx(forcar=True)
         print(_ok(f"✔ Renomeadas {qtd} ocorrência(s) em '{coluna}'."))
     except Exception as e:
         print(_err(f"Erro ao salvar alterações: {e}"))
@@ -911,6 +1564,7 @@ def menu_principal():
         print("  [2] Processar planilhas de 'A serem processadas'")
         print("  [3] Alterar parametrizações (em breve)")
         print("  [4] Alterar valores/nomenclaturas na base de dados (em breve)")
+        print("  [5] Exportar logs e controles para o Excel")
         print("  [0] Sair\n")
 
         escolha = input("👉  Digite o número da opção e pressione Enter: ").strip()
@@ -933,6 +1587,13 @@ def menu_principal():
             input(_muted("\nPressione Enter para voltar ao menu... "))
             continue
 
+        # Exportação sob demanda dos .xlsx de controle (mestres em Parquet)
+        if escolha == "5":
+            exportar_base_xlsx(forcar=True)
+            exportar_controles_xlsx(forcar=True)
+            input(_muted("\nPressione Enter para voltar ao menu... "))
+            continue
+
         # Sair
         if escolha == "0":
             print(_muted("\nEncerrando. Até breve!"))
@@ -962,21 +1623,8 @@ def registrar_erros_consultorios(erros_consultorios):
 
     print(f"📝 Registrando {len(erros_consultorios)} erros em 'consultorios_log' (arquivo de LOG).")
 
-    os.makedirs(CONTROLE_DIR, exist_ok=True)
-
-    sheet = "consultorios_log"
-    try:
-        df_exist = pd.read_excel(CAMINHO_LOGS, sheet_name=sheet, engine="openpyxl")
-    except Exception:
-        df_exist = pd.DataFrame()
-
-    df_new = pd.DataFrame(erros_consultorios)
-    df_out = pd.concat([df_exist, df_new], ignore_index=True)
-
-    with pd.ExcelWriter(CAMINHO_LOGS, engine="openpyxl",
-                        mode=("a" if os.path.exists(CAMINHO_LOGS) else "w"),
-                        if_sheet_exists=("replace" if os.path.exists(CAMINHO_LOGS) else None)) as w:
-        df_out.to_excel(w, sheet_name=sheet, index=False)
+    # só acrescenta as linhas novas ao fim da aba (sem reler nem regravar o log inteiro)
+    _acrescentar_linhas_aba(CAMINHO_LOGS, "consultorios_log", erros_consultorios)
 
     print("✅ Log de consultórios atualizado em 'Log de Erros.xlsx'.")
 
@@ -990,19 +1638,30 @@ def inserir_consultorios(df_consultorios):
 
     print(f"🟢 Inserindo {len(df_consultorios)} registros em '{NOME_ABA_2}'.")
 
-    try:
-        df_antigo = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA_2, engine="openpyxl")
-        df_antigo.columns = [col.strip().lower() for col in df_antigo.columns]
-    except:
+    # aba ainda inexistente → vazio (sem exceção)
+    df_antigo = _ler_aba_xlsx(CAMINHO_BASE, NOME_ABA_2)
+    df_antigo.columns = df_antigo.columns.astype(str).str.strip().str.lower()
+    if df_antigo.columns.empty:  # aba ainda não existe
         df_antigo = pd.DataFrame(columns=["cnes", "competencia", "qtd_consultorios_disponiveis"])
 
-    df_total = pd.concat([df_antigo, df_consultorios], ignore_index=True)
+    # Chaves como texto dos dois lados (o Excel devolve CNES numérico)
+    df_consultorios = df_consultorios.copy()
+    for col in ("cnes", "competencia"):
+        df_antigo[col] = df_antigo[col].astype(str).str.strip()
+        df_consultorios[col] = df_consultorios[col].astype(str).str.strip()
+
+    # Nada a regravar se todas as linhas recebidas já estão na aba com o mesmo valor
+    cols_cons = ["cnes", "competencia", "qtd_consultorios_disponiveis"]
+    linhas_existentes = set(df_antigo[cols_cons].itertuples(index=False, name=None))
+    if all(t in linhas_existentes for t in df_consultorios[cols_cons].itertuples(index=False, name=None)):
+        print(f"ℹ️ Nenhum registro novo de consultórios; '{NOME_ABA_2}' mantida.")
+        return
 
-    # Remover duplicatas
-    df_total.drop_duplicates(subset=["cnes", "competencia"], inplace=True)
+    # Upsert por (cnes, competencia): o valor recebido agora prevalece sobre o antigo
+    df_total = pd.concat([df_antigo, df_consultorios], ignore_index=True)
+    df_total = df_total.drop_duplicates(subset=["cnes", "competencia"], keep="last", ignore_index=True)
 
-    with pd.ExcelWriter(CAMINHO_BASE, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        df_total.to_excel(writer, sheet_name=NOME_ABA_2, index=False)
+    _substituir_aba_openpyxl(CAMINHO_BASE, NOME_ABA_2, df_total)
 
     print("✅ 'db_ambulatorio2' atualizado com sucesso.")
 
@@ -1011,12 +1670,14 @@ def extrair_consultorios(df):
     Procura na coluna F (índice 5) a string 'quantitativo de consultorios'
     e retorna o valor numérico que estiver na célula abaixo.
     """
-    from fuzzywuzzy import fuzz
-
-    col_f = df.iloc[:, 5].astype(str).str.strip().str.lower()
+    alvo = "quantitativo de consultorios"
+    col_f = df.iloc[:, 5].astype(str).str.strip().str.lower().to_numpy()
 
     for i, valor in enumerate(col_f):
-        if fuzz.partial_ratio(valor, "quantitativo de consultorios") >= 85:
+        # filtro barato antes do fuzzy: quase nenhuma célula da coluna F menciona o rótulo
+        if not isinstance(valor, str) or ("quanti" not in valor and "consult" not in valor):
+            continue  # célula vazia (no pandas 3, astype(str) mantém NaN) ou sem o rótulo
+        if fuzz.partial_ratio(valor, alvo, score_cutoff=85):
             try:
                 valor_baixo = df.iloc[i + 1, 5]
                 if pd.notna(valor_baixo):
@@ -1031,71 +1692,80 @@ def extrair_consultorios(df):
 # PROCESSAMENTO DE LOG DE ERROS (especialidades não reconhecidas)
 # ===============================================================
 
-def processar_log_de_erros():
+def processar_log_de_erros(df_base=None):
     """
-    Reanalisa o log central de erros (Controle/Log de Erros.xlsx → 'ambulatorio_log'),
-    tenta corrigir linhas com substituições manuais e insere na base principal.
+    Reanalisa o log central de erros (tabela Parquet do 'ambulatorio_log', da qual o
+    Controle/Log de Erros.xlsx é exportado), tenta corrigir linhas com substituições
+    manuais e insere na base principal. Linhas sem quantitativo numérico continuam no log.
+    df_base: base já carregada (chaves de duplicata) para não relê-la; se None, lê.
+    Retorna as linhas inseridas na base (DataFrame, possivelmente vazio).
     """
+    flush_logs()  # o log precisa conter os erros registrados nesta execução
     try:
-        df_log = pd.read_excel(CAMINHO_LOGS, sheet_name="ambulatorio_log", engine="openpyxl")
+        df_log = ler_tabela_controle(CAMINHO_LOGS_PARQUET)
         if df_log.empty:
             print("✅ Log de erros está vazio.")
-            return
+            return pd.DataFrame(columns=_BASE_COLS)
     except Exception:
-        print("ℹ️ Nenhum log encontrado em Controle/Log de Erros.xlsx (aba 'ambulatorio_log').")
-        return
-
-    df_log["especialidade_original"] = df_log["especialidade_original"].astype(str).str.strip().str.upper()
-
-    # Normaliza o dicionário para uppercase
-    substituicoes_upper = {k.upper(): v for k, v in substituicoes_especialidades.items()}
-
-    corrigidos = []
-    ainda_invalidos = []
-
-    for _, row in df_log.iterrows():
-        especialidade = row["especialidade_original"]
-        substituida = substituicoes_upper.get(especialidade)
-
-        if substituida:
-            print(f"🛠 Corrigindo linha do log: {especialidade} → {substituida}")
-            corrigidos.append({
-                "cnes": str(row["cnes"]).strip(),
-                "competencia": str(row["competencia"]).strip(),
-                "especialidade_original": str(row["especialidade_original"]).strip(),
-                "especialidade": substituida.strip(),
-                "quantitativo de atendimentos": int(row["quantitativo"])
-            })
-        else:
-            ainda_invalidos.append(row)
-
-    df_para_inserir = pd.DataFrame()
-
-    if corrigidos:
-        df_corrigido = pd.DataFrame(corrigidos)
-        df_corrigido.columns = [col.strip().lower() for col in df_corrigido.columns]
-
-        df_base = carregar_base_existente()
-        df_para_inserir = remover_duplicatas(df_corrigido, df_base)
+        print(f"ℹ️ Nenhum log de erros encontrado em '{CAMINHO_LOGS_PARQUET}'.")
+        return pd.DataFrame(columns=_BASE_COLS)
+
+    esp_upper = df_log["especialidade_original"].astype(str).str.strip().str.upper()
+    log_ja_normalizado = bool(esp_upper.eq(df_log["especialidade_original"]).all())
+    df_log["especialidade_original"] = esp_upper
+
+    substituidas = df_log["especialidade_original"].map(_SUBSTITUICOES_UPPER)
+    mask = substituidas.notna() & (substituidas != "")
+
+    # quantitativo vazio/não numérico não vai para a base: a linha fica no log
+    qtd = pd.to_numeric(df_log["quantitativo"], errors="coerce")
+    sem_qtd = mask & qtd.isna()
+    if sem_qtd.any():
+        print(f"⚠️ {int(sem_qtd.sum())} linha(s) do log com substituição mas sem quantitativo numérico continuam no log.")
+        mask &= qtd.notna()
+
+    if VERBOSE and mask.any():
+        # uma única escrita no terminal (console do Windows é lento linha a linha)
+        msgs = [
+            f"🛠 Corrigindo linha do log: {especialidade} → {substituida}"
+            for especialidade, substituida in zip(df_log.loc[mask, "especialidade_original"], substituidas[mask])
+        ]
+        sys.stdout.write("\n".join(msgs) + "\n")
+
+    df_corrigido = pd.DataFrame({
+        "cnes": df_log.loc[mask, "cnes"].astype(str).str.strip(),
+        "competencia": df_log.loc[mask, "competencia"].astype(str).str.strip(),
+        "especialidade_original": df_log.loc[mask, "especialidade_original"],
+        "especialidade": substituidas[mask].astype(str).str.strip(),
+        "quantitativo de atendimentos": qtd[mask].astype("int64"),
+    }).reset_index(drop=True)
+    n_corrigidos = len(df_corrigido)
+
+    df_para_inserir = pd.DataFrame(columns=_BASE_COLS)
+
+    if n_corrigidos:
+        if df_base is None:
+            df_base = carregar_base_existente()
+        df_para_inserir = remover_duplicatas(df_corrigido, df_base.copy())
         inserir_novos_dados(df_para_inserir)
-
-        print(f"✅ Log atualizado. {len(corrigidos)} linhas corrigidas, {len(df_para_inserir)} inseridas na base.")
     else:
         print("ℹ️ Nenhuma linha foi corrigida a partir do log.")
+        if log_ja_normalizado:
+            return df_para_inserir  # log inalterado: nada a regravar
 
     # ✅ Atualiza o log (ainda inválidos continuam no LOG CENTRAL)
-    df_novo_log = pd.DataFrame(ainda_invalidos)
-    with pd.ExcelWriter(CAMINHO_LOGS, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        df_novo_log.to_excel(writer, sheet_name="ambulatorio_log", index=False)
+    df_novo_log = df_log.loc[~mask].reset_index(drop=True)
+    gravar_tabela_controle(CAMINHO_LOGS_PARQUET, df_novo_log)
 
-    print(f"✅ Log atualizado. {len(corrigidos)} linhas corrigidas, {len(df_para_inserir)} inseridas na base.")
+    print(f"✅ Log atualizado. {n_corrigidos} linhas corrigidas, {len(df_para_inserir)} inseridas na base.")
+    return df_para_inserir
 
 def _retificar_alterar_motivo(esp_escolhida: str):
     """
     Atualiza o 'motivo' de TODAS as ocorrências dessa especialidade no LOG.
     """
     try:
-        df_log = pd.read_excel(CAMINHO_LOGS, sheet_name="ambulatorio_log", engine="openpyxl")
+        df_log = ler_tabela_controle(CAMINHO_LOGS_PARQUET)
     except Exception:
         print(_warn("Log não encontrado ou sem aba 'ambulatorio_log'."))
         return
@@ -1120,8 +1790,7 @@ def _retificar_alterar_motivo(esp_escolhida: str):
 
     df_log.loc[mask, "motivo"] = motivo_novo
 
-    with pd.ExcelWriter(CAMINHO_LOGS, engine="openpyxl", mode="a", if_sheet_exists="replace") as w:
-        df_log.to_excel(w, sheet_name="ambulatorio_log", index=False)
+    gravar_tabela_controle(CAMINHO_LOGS_PARQUET, df_log)
 
     print(_ok(f"✔ Motivo atualizado em {n} ocorrência(s)."))
 
@@ -1134,7 +1803,7 @@ def _retificar_alterar_especialidade_e_inserir(esp_escolhida: str):
     atualizando 'Ambulatorial – Qualificação'.
     """
     try:
-        df_log = pd.read_excel(CAMINHO_LOGS, sheet_name="ambulatorio_log", engine="openpyxl")
+        df_log = ler_tabela_controle(CAMINHO_LOGS_PARQUET)
     except Exception:
         print(_warn("Log não encontrado ou sem aba 'ambulatorio_log'."))
         return
@@ -1184,14 +1853,24 @@ def _retificar_alterar_especialidade_e_inserir(esp_escolhida: str):
     # Monta dataframe para inserir na base
     sub["cnes"] = sub["cnes"].astype(str).str.strip()
     sub["competencia"] = sub["competencia"].astype(str).str.strip()
-    sub["quantitativo"] = sub["quantitativo"].astype(int)
+
+    # quantitativo vazio/não numérico não vai para a base: essas ocorrências ficam no log
+    qtd = pd.to_numeric(sub["quantitativo"], errors="coerce")
+    sem_qtd = qtd.isna()
+    if sem_qtd.any():
+        print(_warn(f"{int(sem_qtd.sum())} ocorrência(s) sem quantitativo numérico continuam no log."))
+        mask &= ~df_log.index.isin(sub.index[sem_qtd])
+        sub, qtd = sub[~sem_qtd].copy(), qtd[~sem_qtd]
+        if sub.empty:
+            return
+    sub["quantitativo"] = qtd.astype("int64")
 
     df_ins = pd.DataFrame({
         "cnes": sub["cnes"],
         "competencia": sub["competencia"],
         "especialidade_original": sub["especialidade_original"].astype(str),
         "especialidade": destino,
-        "quantitativo de atendimentos": sub["quantitativo"].astype(int)
+        "quantitativo de atendimentos": sub["quantitativo"]
     })
 
     # Inserir na base (evita duplicatas)
@@ -1200,16 +1879,20 @@ def _retificar_alterar_especialidade_e_inserir(esp_escolhida: str):
     inserir_novos_dados(df_novos)
 
     # Registrar em Mudanças e Registros (uma linha por ocorrência)
-    for _, r in sub.iterrows():
-        cnes = str(r["cnes"]).strip()
+    agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    arquivos_sub = sub["arquivo"] if "arquivo" in sub.columns else [""] * len(sub)
+    for arquivo, cnes, competencia, esp_original in zip(
+        arquivos_sub, sub["cnes"], sub["competencia"], sub["especialidade_original"]
+    ):
+        cnes = str(cnes).strip()
         nome_hosp = _nome_oficial_por_cnes(cnes) or ""
         registrar_mudancas_e_registros({
-            "data_registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "arquivo": r.get("arquivo", ""),
+            "data_registro": agora,
+            "arquivo": arquivo,
             "cnes": cnes,
             "nome_hospital": nome_hosp,
-            "competencia": str(r["competencia"]).strip(),
-            "especialidade_original": str(r["especialidade_original"]),
+            "competencia": str(competencia).strip(),
+            "especialidade_original": str(esp_original),
             "especialidade_final": destino,
             "resolucao": "Mudança por retificação"
         })
@@ -1221,25 +1904,24 @@ def _retificar_alterar_especialidade_e_inserir(esp_escolhida: str):
         linhas=("quantitativo","size"),
         soma=("quantitativo","sum")
     )
-    for _, g in grp.iterrows():
-        cnes = str(g["cnes"]).strip()
+    for arquivo, competencia, cnes, linhas, soma in grp[["arquivo", "competencia", "cnes", "linhas", "soma"]].itertuples(index=False, name=None):
+        cnes = str(cnes).strip()
         ajustes.append({
-            "arquivo": g["arquivo"],
-            "competencia": g["competencia"],
+            "arquivo": arquivo,
+            "competencia": competencia,
             "cnes": cnes,
             "nome_hospital": _nome_oficial_por_cnes(cnes) or "",
-            "delta_linhas_logs": -int(g["linhas"]),
-            "delta_linhas_base": +int(g["linhas"]),
-            "delta_soma_logs": -int(g["soma"]),
-            "delta_soma_base": +int(g["soma"]),
+            "delta_linhas_logs": -int(linhas),
+            "delta_linhas_base": +int(linhas),
+            "delta_soma_logs": -int(soma),
+            "delta_soma_base": +int(soma),
         })
     if ajustes:
         _atualizar_qualificacao_por_retificacao(ajustes)
 
     # Remover APENAS essas ocorrências do LOG
     df_log_restante = df_log[~mask].copy()
-    with pd.ExcelWriter(CAMINHO_LOGS, engine="openpyxl", mode="a", if_sheet_exists="replace") as w:
-        df_log_restante.to_excel(w, sheet_name="ambulatorio_log", index=False)
+    gravar_tabela_controle(CAMINHO_LOGS_PARQUET, df_log_restante)
 
     print(_ok(f"✔ Retificação concluída: {len(sub)} ocorrência(s) movidas para a base e removidas do log."))
 
@@ -1280,12 +1962,17 @@ def retificar_uma_especialidade():
 # EXTRAÇÃO E PADRONIZAÇÃO DE INFORMAÇÕES
 # ===============================================================
 
+# Competência no nome do arquivo: "-MM_AAAA" (ou "-MM-AAAA")
+_COMP_ARQUIVO_RE = re.compile(r"-?(\d{2})[_-](\d{4})")
+
+@functools.lru_cache(maxsize=512)
 def extrair_nome_hospital_e_competencia(nome_arquivo):
     """
     Extrai o nome do hospital e a competência (mês/ano) a partir do nome do arquivo.
     Exemplo: "HM_JABAQUARA-01_2025.xlsx" → "HM JABAQUARA", "2025-01"
+    Memoizada: é chamada mais de uma vez para o mesmo arquivo.
     """
-    match = re.search(r"-?(\d{2})[_-](\d{4})", nome_arquivo)
+    match = _COMP_ARQUIVO_RE.search(nome_arquivo)
     if match:
         competencia = f"{match.group(2)}-{match.group(1)}"
         nome = nome_arquivo.split("-")[0].replace("_", " ").strip()
@@ -1416,7 +2103,7 @@ def resolver_especialidade_nao_reconhecida(especialidade_original: str, cnes: st
             return None
         if acao == "q":
             # cancela sem ação
-            ULTIMO_MOTIVO_ERRO = "Operação cancelada pelo usuário"
+            ULTIMO_MOTIVO_ERRO = MOTIVO_CANCELADO
             ULTIMA_RESOLUCAO_TEXTO = None
             return None
 
@@ -1450,9 +2137,12 @@ def resolver_especialidade_nao_reconhecida(especialidade_original: str, cnes: st
 
         # guarda substituição global (em UPPER como chave de origem)
         substituicoes_especialidades[termo_up] = destino
+        _SUBSTITUICOES_UPPER[termo_up] = destino
+        _padronizar_cached.cache_clear()
         if destino not in lista_especialidades_ambulatorio:
             lista_especialidades_ambulatorio.append(destino)
-        salvar_config()
+            _atualizar_indice_especialidades()
+        _marcar_config_pendente()
 
         # memoriza decisão por hospital+termo
         _set_decisao(cnes, termo_up, "M", destino, resol)
@@ -1467,7 +2157,6 @@ def padronizar_especialidade(especialidade_original, cnes: str):
     3) Senão, pergunta (L/M) e memoriza.
     """
     global ULTIMO_MOTIVO_ERRO
-    from fuzzywuzzy import process as fz
 
     termo = str(especialidade_original).strip()
     termo_up = termo.upper()
@@ -1482,22 +2171,16 @@ def padronizar_especialidade(especialidade_original, cnes: str):
             return None
 
     # 2) Políticas
-    if termo_up in termos_proibidos:
+    if termo_up in _TERMOS_PROIBIDOS_SET:
         print(f"🚫 Ignorada por política: '{termo}'")
         return None
 
-    # 3) Substituição global
-    subs_upper = {k.upper(): v for k, v in substituicoes_especialidades.items()}
-    if termo_up in subs_upper:
-        return subs_upper[termo_up]
-
-    # 4) Fuzzy “seguro”
-    if lista_especialidades_ambulatorio:
-        melhor, score = fz.extractOne(termo, lista_especialidades_ambulatorio)
-        if score >= 95:
-            return melhor
+    # 3) Busca exata, substituição global e fuzzy (em cache por termo)
+    padronizada = _padronizar_cached(termo)
+    if padronizada is not None:
+        return padronizada
 
-    # 5) Perguntar (L/M) e memorizar
+    # 4) Perguntar (L/M) e memorizar
     return resolver_especialidade_nao_reconhecida(termo, cnes)
 
 def buscar_cnes_por_nome(nome_hospital_bruto):
@@ -1508,25 +2191,19 @@ def buscar_cnes_por_nome(nome_hospital_bruto):
        - Assume CNES na coluna A e Nome do hospital na coluna D (mesma convenção antiga).
     2) (fallback) Se falhar, tenta a aba 'hospitais' do dbProducao.xlsx (se existir).
     """
-    def _tentar_ler_hospitais_xlsx(caminho):
-        # Retorna DataFrame com colunas "cnes" e "nome_hospital" padronizadas
-        xls = pd.ExcelFile(caminho, engine="openpyxl")
-        sheet = "hospitais" if "hospitais" in [s.lower() for s in xls.sheet_names] else xls.sheet_names[0]
-        df_raw = pd.read_excel(xls, sheet_name=sheet, engine="openpyxl")
-        # Tenta pegar CNES (coluna A) e Nome (coluna D), como você já usava
-        df = df_raw.iloc[:, [0, 3]].copy()
-        df.columns = ["cnes", "nome_hospital"]
-        df["cnes"] = df["cnes"].astype(str).str.strip()
-        df["nome_hospital"] = df["nome_hospital"].astype(str).str.strip().str.upper()
-        return df
+    termo = utils.default_process(str(nome_hospital_bruto).strip().upper())
 
     try:
-        # 1) Tenta dHospitais.xlsx
+        # 1) Tenta dHospitais.xlsx (índice em cache até o arquivo mudar)
         if os.path.exists(CAMINHO_DHOSPITAIS):
-            df_hosp = _tentar_ler_hospitais_xlsx(CAMINHO_DHOSPITAIS)
-            melhor_nome, score = process.extractOne(str(nome_hospital_bruto).strip().upper(), df_hosp["nome_hospital"].tolist())
+            mtime = os.path.getmtime(CAMINHO_DHOSPITAIS)
+            abas = _abas_xlsx_cached(CAMINHO_DHOSPITAIS, mtime)
+            aba = next((s for s in abas if s.lower() == "hospitais"), abas[0])
+            nomes, nomes_proc, lista_cnes, exatos = _indice_fuzzy_hospitais(CAMINHO_DHOSPITAIS, aba, mtime)
+            score, idx = _melhor_hospital(termo, nomes_proc, exatos)
+            melhor_nome = nomes[idx]
             if score >= 90:
-                cnes = df_hosp.loc[df_hosp["nome_hospital"] == melhor_nome, "cnes"].iloc[0]
+                cnes = lista_cnes[idx]
                 print(f"🏥 Hospital (dHospitais): '{melhor_nome}' → CNES: {cnes} (confiança: {score}%)")
                 return cnes
             else:
@@ -1536,13 +2213,14 @@ def buscar_cnes_por_nome(nome_hospital_bruto):
 
         # 2) Fallback: tenta dbProducao.xlsx (se já existir)
         if os.path.exists(CAMINHO_BASE):
-            df_hospitais = pd.read_excel(CAMINHO_BASE, sheet_name="hospitais", engine="openpyxl")
-            nomes_candidatos = df_hospitais.iloc[:, 3].astype(str).str.upper().tolist()  # Coluna D
-            melhor_nome, score = process.extractOne(str(nome_hospital_bruto).strip().upper(), nomes_candidatos)
+            nomes, nomes_proc, lista_cnes, exatos = _indice_fuzzy_hospitais(
+                CAMINHO_BASE, "hospitais", os.path.getmtime(CAMINHO_BASE)
+            )
+            score, idx = _melhor_hospital(termo, nomes_proc, exatos)
+            melhor_nome = nomes[idx]
 
             if score >= 90:
-                linha = df_hospitais[df_hospitais.iloc[:, 3].astype(str).str.upper() == melhor_nome]
-                cnes = str(linha.iloc[0, 0]).strip()  # Coluna A
+                cnes = lista_cnes[idx]  # Coluna A
                 print(f"🏥 Hospital (dbProducao): '{melhor_nome}' → CNES: {cnes} (confiança: {score}%)")
                 return cnes
             else:
@@ -1563,6 +2241,117 @@ def buscar_cnes_por_nome(nome_hospital_bruto):
 # FUNÇÃO PRINCIPAL DE LEITURA DAS PLANILHAS NOVAS
 # ===============================================================
 
+def _chave_cache_planilha(caminho_arquivo):
+    """Chave do cache de uma planilha: hash do conteúdo do arquivo."""
+    with open(caminho_arquivo, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def _caminho_cache_planilha(chave):
+    return os.path.join(CAMINHO_CACHE_PLANILHAS, f"{chave}.parquet")
+
+def _aba_como_texto(df):
+    """
+    Células da aba como texto (vazio continua vazio) e nomes de coluna como texto.
+    É a forma gravada no cache (Parquet, sem tipos mistos por coluna) e também a
+    devolvida numa leitura nova, para as duas darem o mesmo resultado.
+    """
+    df = df.apply(lambda col: col.map(lambda v: v if pd.isna(v) else str(v)))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+def _ler_aba_ambulatorio(caminho_arquivo, usar_cache=None, chave=None):
+    """
+    Lê a aba 'Ambulatorio' (ou variação) de uma planilha de entrada, com as células
+    como texto (_aba_como_texto). Retorna (df, chave_cache); df é None se a planilha
+    não tiver essa aba.
+    Com USAR_CACHE_PLANILHAS, a aba lida fica em Planilhas/.cache/<hash>.parquet:
+    um arquivo com o mesmo conteúdo não é reinterpretado na execução seguinte.
+    chave: hash do arquivo já calculado por quem chamou (evita reler o arquivo).
+    """
+    if usar_cache is None:
+        usar_cache = USAR_CACHE_PLANILHAS
+    if usar_cache:
+        if chave is None:
+            chave = _chave_cache_planilha(caminho_arquivo)
+        caminho_cache = _caminho_cache_planilha(chave)
+        if os.path.exists(caminho_cache):
+            try:
+                return pd.read_parquet(caminho_cache), chave
+            except (OSError, pa.ArrowException) as e:
+                print(f"⚠️ Cache de '{os.path.basename(caminho_arquivo)}' ilegível ({e}); relendo a planilha.")
+    else:
+        chave = None
+
+    with pd.ExcelFile(caminho_arquivo, engine=READ_ENGINE) as xls:
+        # Só a aba "ambulatorio" interessa: para no primeiro nome que bater
+        aba_certa = next((nome for nome in xls.sheet_names if normalizar(nome) == "ambulatorio"), None)
+        if aba_certa is None:
+            return None, chave
+        df = _aba_como_texto(pd.read_excel(xls, sheet_name=aba_certa))
+
+    if chave:
+        try:
+            os.makedirs(CAMINHO_CACHE_PLANILHAS, exist_ok=True)
+            tmp = caminho_cache + ".tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, caminho_cache)
+        except (OSError, pa.ArrowException) as e:
+            print(f"⚠️ Não foi possível gravar o cache da planilha: {e}")
+    return df, chave
+
+def _ler_abas_em_paralelo(caminhos):
+    """
+    Lê a aba 'Ambulatorio' de várias planilhas ao mesmo tempo, em processos separados
+    (a interpretação do .xlsx é CPU). Só a leitura vai para os processos: padronização,
+    perguntas ao usuário e gravações continuam no processo principal, na ordem dos arquivos.
+    Planilhas já no cache não vão para os processos, e com menos de
+    MIN_ARQUIVOS_PARALELO planilhas a ler o pool nem é criado (no Windows cada
+    processo reimporta o script, o que não compensa para poucos arquivos).
+    Retorna ({caminho: (df, chave_cache)}, {caminho: chave_cache}); o que falhar aqui é
+    relido (e reportado) no loop, reaproveitando a chave já calculada.
+    """
+    lidas, chaves, a_ler = {}, {}, []
+    for caminho in caminhos:
+        chave = None
+        if USAR_CACHE_PLANILHAS:
+            try:
+                chave = chaves[caminho] = _chave_cache_planilha(caminho)
+            except OSError:
+                continue  # o loop principal relê e reporta o erro
+            if os.path.exists(_caminho_cache_planilha(chave)):
+                continue  # leitura do cache é rápida: fica no loop principal
+        a_ler.append((caminho, chave))
+
+    n_proc = min(len(a_ler), os.cpu_count() or 1, MAX_PROCESSOS_LEITURA)
+    if len(a_ler) < MIN_ARQUIVOS_PARALELO or n_proc < 2:
+        return lidas, chaves
+    try:
+        with ProcessPoolExecutor(max_workers=n_proc) as ex:
+            futuros = {
+                ex.submit(_ler_aba_ambulatorio, caminho, USAR_CACHE_PLANILHAS, chave): caminho
+                for caminho, chave in a_ler
+            }
+            for futuro, caminho in futuros.items():
+                try:
+                    lidas[caminho] = futuro.result()
+                except Exception as e:
+                    print(f"⚠️ Leitura em paralelo de '{os.path.basename(caminho)}' falhou ({e}); será relida.")
+    except Exception as e:
+        print(f"⚠️ Leitura em paralelo indisponível ({e}); lendo uma planilha por vez.")
+    return lidas, chaves
+
+def _podar_cache_planilhas(chaves_em_uso: set):
+    """Remove do cache as planilhas que já saíram da pasta de entrada (e sobras de outros formatos)."""
+    if not os.path.isdir(CAMINHO_CACHE_PLANILHAS):
+        return
+    for nome in os.listdir(CAMINHO_CACHE_PLANILHAS):
+        chave, ext = os.path.splitext(nome)
+        if ext != ".parquet" or chave not in chaves_em_uso:
+            try:
+                os.remove(os.path.join(CAMINHO_CACHE_PLANILHAS, nome))
+            except OSError:
+                pass
+
 def ler_planilhas_ambulatorio():
     """
     Lê todas as planilhas da pasta de entrada, extrai dados da aba 'Ambulatorio',
@@ -1574,7 +2363,9 @@ def ler_planilhas_ambulatorio():
     print("📁 Conteúdo da pasta:")
     print(os.listdir(CAMINHO_PLANILHAS))
 
-    dados_para_inserir = []
+    # Acumuladores em list de dicts: cada um vira DataFrame uma única vez, no fim
+    # (nunca concatenar DataFrames linha a linha dentro do loop de arquivos)
+    dados_para_inserir = {col: [] for col in _BASE_COLS}  # colunar: uma lista por coluna da base
     arquivos_lidos = []
     consultorios_extraidos = []
 
@@ -1587,37 +2378,38 @@ def ler_planilhas_ambulatorio():
     if not arquivos:
         print(f"⚠️ Nenhuma planilha encontrada para processar em: {CAMINHO_PLANILHAS}")
         # Retorna 5 valores: df_resultado, arquivos_lidos, linhas_invalidas, consultorios_extraidos, erros_consultorios
-        return pd.DataFrame(), [], [], [], []
+        return pd.DataFrame(columns=_BASE_COLS), [], [], [], []
 
     
     linhas_invalidas = []
+    chaves_cache_em_uso = set()
+    lidas, chaves_lidas = _ler_abas_em_paralelo([os.path.join(CAMINHO_PLANILHAS, arq) for arq in arquivos])
 
     for arquivo in arquivos:
         caminho_arquivo = os.path.join(CAMINHO_PLANILHAS, arquivo)
         print(f"\n📄 Processando: {arquivo}")
 
         try:
-            with pd.ExcelFile(caminho_arquivo) as xls:
-                abas_disponiveis = xls.sheet_names
-                abas_normalizadas = {normalizar(nome): nome for nome in abas_disponiveis}
-
-                if "ambulatorio" not in abas_normalizadas:
-                    print(f"⚠️ A planilha '{arquivo}' não possui a aba 'Ambulatorio' (ou variação).")
-
-                    nome_hospital, _ = extrair_nome_hospital_e_competencia(arquivo)
-                    cnes = buscar_cnes_por_nome(nome_hospital)
+            if caminho_arquivo in lidas:
+                df, chave_cache = lidas[caminho_arquivo]
+            else:
+                df, chave_cache = _ler_aba_ambulatorio(caminho_arquivo, chave=chaves_lidas.get(caminho_arquivo))
+            if chave_cache:
+                chaves_cache_em_uso.add(chave_cache)
 
-                    if cnes and cnes in cnes_sem_ambulatorio:
-                        print(f"🔕 Hospital '{nome_hospital}' (CNES: {cnes}) não possui ambulatório. Movendo para 'Arquivadas'.")
-                        arquivos_lidos.append(arquivo)  # mover para Arquivadas normalmente
-                    else:
-                        print(f"⚠️ CNES '{cnes}' não está na lista de exceções. Planilha ignorada.")
+            if df is None:
+                print(f"⚠️ A planilha '{arquivo}' não possui a aba 'Ambulatorio' (ou variação).")
 
-                    continue
+                nome_hospital, _ = extrair_nome_hospital_e_competencia(arquivo)
+                cnes = buscar_cnes_por_nome(nome_hospital)
 
+                if cnes and cnes in cnes_sem_ambulatorio:
+                    print(f"🔕 Hospital '{nome_hospital}' (CNES: {cnes}) não possui ambulatório. Movendo para 'Arquivadas'.")
+                    arquivos_lidos.append(arquivo)  # mover para Arquivadas normalmente
+                else:
+                    print(f"⚠️ CNES '{cnes}' não está na lista de exceções. Planilha ignorada.")
 
-                aba_certa = abas_normalizadas["ambulatorio"]
-                df = pd.read_excel(xls, sheet_name=aba_certa)
+                continue
 
             # --- contadores por arquivo ---
             linhas_raw = 0
@@ -1628,13 +2420,15 @@ def ler_planilhas_ambulatorio():
             soma_erros = 0
             competencias_vistas = set()
 
-            tem_coluna_mes = any(col.lower().strip() == "mês referente" for col in df.columns)
+            # cabeçalhos normalizados uma vez → posição da primeira coluna com esse nome
+            posicoes_colunas = {}
+            for pos, col in enumerate(df.columns):
+                posicoes_colunas.setdefault(str(col).lower().strip(), pos)
+            pos_mes = posicoes_colunas.get("mês referente")
             usar_mes_referente = False
 
-            if tem_coluna_mes:
-                colunas_mes = [col for col in df.columns if col.lower().strip() == "mês referente"]
-                coluna_mes_nome = colunas_mes[0]
-                meses_unicos = df[coluna_mes_nome].dropna().unique()
+            if pos_mes is not None:
+                meses_unicos = df.iloc[:, pos_mes].dropna().unique()
 
                 if len(meses_unicos) > 1:
                     usar_mes_referente = True
@@ -1650,100 +2444,123 @@ def ler_planilhas_ambulatorio():
 
 
 
-            for _, row in df.iterrows():
-                especialidade_bruta = row.iloc[2]
-                quantitativo = row.iloc[3]
+            # Só as colunas usadas: C (especialidade), D (quantitativo) e, se for o caso, "Mês Referente"
+            esp_col = df.iloc[:, 2]
+            qtd_col = df.iloc[:, 3]
 
-                # ⚠️ Aviso se quantitativo for 0 ou ausente
-                if pd.isna(quantitativo) or quantitativo == 0:
+            # Linhas ignoradas: quantitativo 0/ausente e especialidade "TOTAL"
+            # As células chegam como texto (_aba_como_texto): célula só com espaços conta como
+            # ausente; texto que não é número (ex.: "-") segue como candidata e vai para o log
+            qtd_num = pd.to_numeric(qtd_col, errors="coerce")
+            qtd_vazio = qtd_col.isna() | qtd_col.map(lambda v: isinstance(v, str) and not v.strip())
+            mask_zero = qtd_vazio | (qtd_num == 0)
+            mask_total = ~mask_zero & (esp_col.astype(str).str.strip().str.upper() == "TOTAL")
+            for especialidade_bruta, zero, total in zip(esp_col, mask_zero, mask_total):
+                if zero:
                     print(f"⚠️ Quantitativo zero ou ausente ignorado | Arquivo: {arquivo} | Especialidade: {especialidade_bruta}")
-                    continue
-
-                # 📅 Definindo competência baseada na coluna "Mês Referente" (se aplicável)
-                competencia = competencia_padrao
-                if usar_mes_referente:
-                    try:
-                        mes_raw = str(row[coluna_mes_nome])
-                        if "," in mes_raw:
-                            nome_mes, ano = [s.strip() for s in mes_raw.split(",")]
-                            mes_num = mes_para_numero(nome_mes)
-                            if mes_num:
-                                competencia = f"{ano}-{mes_num}"
-                    except Exception as e:
-                        print(f"⚠️ Erro ao interpretar mês referente na linha: {e}")
-
-                # Ignora linha com especialidade "TOTAL"
-                if str(especialidade_bruta).strip().upper() == "TOTAL":
+                elif total:
                     print(f"⚠️ Linha ignorada por conter especialidade TOTAL | Arquivo: {arquivo}")
-                    continue
 
-                # Contabiliza RAW (linha candidata) antes de padronizar
-                linhas_raw += 1
-                try:
-                    soma_raw += int(quantitativo)
-                except Exception:
-                    pass
-                
+            # Linhas candidatas (RAW), contabilizadas antes de padronizar
+            candidatas = ~mask_zero & ~mask_total
+            esp_cand = esp_col[candidatas]
+            qtd_cand = qtd_col[candidatas]
 
-                # Padronização / decisão L ou M
+            # 📅 Competência por linha a partir da coluna "Mês Referente" (se aplicável)
+            if usar_mes_referente:
+                comp_cand = df.iloc[:, pos_mes][candidatas].map(
+                    lambda v: _competencia_mes_referente(v, competencia_padrao)
+                )
+            else:
+                comp_cand = pd.Series(competencia_padrao, index=esp_cand.index)
+
+            linhas_raw = len(esp_cand)
+            # quantitativo como inteiro uma única vez (não numérico conta 0 nas somas)
+            qtd_int = qtd_num[candidatas].fillna(0).astype("int64")
+            soma_raw = int(qtd_int.sum())
+
+            # Padronização / decisão L ou M: uma vez por especialidade distinta (na ordem em que aparecem).
+            # Um termo cancelado (Q) não é memorizado: a próxima linha com ele pergunta de novo.
+            chaves = esp_cand.map(str)  # texto como chave; vazio vira "nan", como o str() de padronizar_especialidade
+            _fuzzy_em_lote(str(e).strip() for e in esp_cand.unique())
+            padronizadas = {}  # chave → (corrigida | None, motivo | None, resolução | None, posição da linha)
+            resultados = []    # por linha: o resultado do termo (ou o da própria linha, se cancelada)
+            qtd_numerico = qtd_num[candidatas].notna()
+            for pos, (chave, especialidade_bruta, numerico) in enumerate(zip(chaves, esp_cand, qtd_numerico)):
+                if not numerico:
+                    # quantitativo não numérico: a linha vai para o log sem perguntar a especialidade
+                    print(f"⚠️ Quantitativo não numérico enviado ao log | Arquivo: {arquivo} | Especialidade: {especialidade_bruta}")
+                    resultados.append((None, MOTIVO_QTD_NAO_NUMERICO, None, pos))
+                    continue
+                if chave in padronizadas:
+                    resultados.append(padronizadas[chave])
+                    continue
                 especialidade_corrigida = padronizar_especialidade(especialidade_bruta, cnes)
-
-
+                motivo = None
                 if not especialidade_corrigida:
                     # Usa o motivo digitado (se houver), senão mantém o padrão
                     motivo = (ULTIMO_MOTIVO_ERRO or "Especialidade não reconhecida pelo fuzzy")
                     ULTIMO_MOTIVO_ERRO = None  # limpa a flag
-
-                    linhas_invalidas.append({
-                        "arquivo": arquivo,
-                        "cnes": cnes,
-                        "competencia": competencia,
-                        "especialidade_original": especialidade_bruta,
-                        "quantitativo": quantitativo,
-                        "motivo": motivo
-                    })
-                    # contadores de erro
-                    linhas_erros += 1
-                    try:
-                        soma_erros += int(quantitativo)
-                    except Exception:
-                        pass
-
-                    continue
-
-                # Linha válida: guarda original e final
-                dados_para_inserir.append({
+                resultado = (especialidade_corrigida or None, motivo, ULTIMA_RESOLUCAO_TEXTO, pos)
+                ULTIMA_RESOLUCAO_TEXTO = None
+                if motivo != MOTIVO_CANCELADO:
+                    padronizadas[chave] = resultado
+                resultados.append(resultado)
+
+            corrigidas = pd.Series([r[0] for r in resultados], index=esp_cand.index, dtype=object)
+            mask_ok = corrigidas.notna()
+
+            # Linhas inválidas → log de erros
+            motivos = [r[1] for r in resultados]
+            for especialidade_bruta, quantitativo, competencia, motivo in zip(
+                esp_cand[~mask_ok], qtd_cand[~mask_ok], comp_cand[~mask_ok],
+                (m for m, ok in zip(motivos, mask_ok) if not ok)
+            ):
+                linhas_invalidas.append({
+                    "arquivo": arquivo,
                     "cnes": cnes,
                     "competencia": competencia,
-                    "especialidade_original": str(especialidade_bruta),
-                    "especialidade": especialidade_corrigida,  # final
-                    "quantitativo de atendimentos": int(quantitativo)
+                    "especialidade_original": especialidade_bruta,
+                    "quantitativo": quantitativo,
+                    "motivo": motivo
+                })
+            linhas_erros = int((~mask_ok).sum())
+            soma_erros = int(qtd_int[~mask_ok].sum())
+
+            # Linhas válidas: guarda original e final. Todas as colunas são montadas antes
+            # de acrescentar qualquer uma: um erro aqui descarta o arquivo inteiro, sem
+            # deixar as listas de dados_para_inserir com tamanhos diferentes.
+            n_ok = int(mask_ok.sum())
+            novas = {
+                "cnes": [cnes] * n_ok,
+                "competencia": comp_cand[mask_ok].tolist(),
+                "especialidade_original": esp_cand[mask_ok].astype(str).tolist(),
+                "especialidade": corrigidas[mask_ok].tolist(),  # final
+                # os mesmos inteiros das somas de controle (soma_raw/soma_base)
+                "quantitativo de atendimentos": qtd_int[mask_ok].tolist(),
+            }
+            for col, valores in novas.items():
+                dados_para_inserir[col].extend(valores)
+            linhas_base = n_ok
+            soma_base = int(qtd_int[mask_ok].sum())
+            competencias_vistas.update(comp_cand[mask_ok])
+
+            # Se houve correção manual agora, grava **uma vez** no arquivo unificado de mudanças/registros
+            # (na linha do termo que disparou a pergunta)
+            agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for especialidade_corrigida, _, resolucao, primeira in padronizadas.values():
+                if not (resolucao and especialidade_corrigida):
+                    continue
+                registrar_mudancas_e_registros({
+                    "data_registro": agora,
+                    "arquivo": arquivo,
+                    "cnes": cnes,
+                    "nome_hospital": nome_hospital,
+                    "competencia": comp_cand.iloc[primeira],
+                    "especialidade_original": str(esp_cand.iloc[primeira]),
+                    "especialidade_final": especialidade_corrigida,
+                    "resolucao": resolucao
                 })
-
-                # contadores de base
-                linhas_base += 1
-                try:
-                    soma_base += int(quantitativo)
-                except Exception:
-                    pass
-
-                # marca competencia vista
-                competencias_vistas.add(competencia)
-
-                
-                # Se houve correção manual agora, grava **uma vez** no arquivo unificado de mudanças/registros
-                if ULTIMA_RESOLUCAO_TEXTO:
-                    registrar_mudancas_e_registros({
-                        "data_registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "arquivo": arquivo,
-                        "cnes": cnes,
-                        "nome_hospital": nome_hospital,
-                        "competencia": competencia,
-                        "especialidade_original": str(especialidade_bruta),
-                        "especialidade_final": especialidade_corrigida,
-                        "resolucao": ULTIMA_RESOLUCAO_TEXTO
-                    })
-                    ULTIMA_RESOLUCAO_TEXTO = None
 
             # === RESUMO POR ARQUIVO ===
             if competencias_vistas:
@@ -1777,17 +2594,8 @@ def ler_planilhas_ambulatorio():
             elif linhas_base == 0 and linhas_erros == 0:
                 status = "Sem Dados"
 
-            
-            # 👉 Atualiza também a grade em colunas por competência (formato do print)
-            try:
-                atualizar_controle_atualizacao_grade(
-                    cnes=cnes,
-                    nome_hospital=nome_hospital,
-                    competencias=sorted(list(competencias_vistas)) if competencias_vistas else [competencia_padrao]
-                )
-            except Exception as e:
-                print(f"❌ Erro ao atualizar grade de controle: {e}")
 
+            # (a grade por competência é reconstruída uma única vez, ao final do processamento)
 
             # 👇 estes blocos rodam UMA VEZ por arquivo (fora do for)
             qtd_consultorios = extrair_consultorios(df)
@@ -1814,8 +2622,17 @@ def ler_planilhas_ambulatorio():
         except Exception as e:
             print(f"❌ Erro ao processar {arquivo}: {e}")
 
-    df_resultado = pd.DataFrame(dados_para_inserir)
-    df_resultado.columns = [col.strip().lower() for col in df_resultado.columns]
+    _podar_cache_planilhas(chaves_cache_em_uso)
+
+    # As chaves dos registros já estão no formato da base (minúsculas)
+    if not dados_para_inserir["cnes"]:
+        return pd.DataFrame(columns=_BASE_COLS), arquivos_lidos, linhas_invalidas, consultorios_extraidos, erros_consultorios
+
+    # Monta direto das colunas (sem inferir tipos linha a linha); quantitativo já sai int64
+    dados_para_inserir["quantitativo de atendimentos"] = np.array(
+        dados_para_inserir["quantitativo de atendimentos"], dtype=np.int64
+    )
+    df_resultado = pd.DataFrame(dados_para_inserir, columns=_BASE_COLS)
 
     return df_resultado, arquivos_lidos, linhas_invalidas, consultorios_extraidos, erros_consultorios
 
@@ -1823,23 +2640,175 @@ def ler_planilhas_ambulatorio():
 # INSERÇÃO DE DADOS AMBULATORIAIS NA BASE PRINCIPAL
 # ===============================================================
 
+def _preparar_para_parquet(df):
+    """
+    Padroniza colunas e tipos antes de gravar no Parquet,
+    para que todos os arquivos do dataset tenham o mesmo schema.
+    """
+    df = df.reindex(columns=_BASE_COLS).copy()
+    for col in ("cnes", "competencia", "especialidade_original", "especialidade"):
+        df[col] = df[col].astype(str).str.strip()
+    df["quantitativo de atendimentos"] = (
+        pd.to_numeric(df["quantitativo de atendimentos"], errors="coerce").fillna(0).astype("int64")
+    )
+    return df
+
+def _gravar_base_parquet(df, substituir=False):
+    """
+    Acrescenta (ou, com substituir=True, regrava) linhas no dataset Parquet da base.
+    No modo acréscimo, só as linhas novas são escritas (um arquivo novo por competência).
+    """
+    tabela = pa.Table.from_pandas(_preparar_para_parquet(df), preserve_index=False)
+    if not substituir:
+        pq.write_to_dataset(tabela, root_path=CAMINHO_BASE_PARQUET, partition_cols=["competencia"])
+        return
+
+    # Regrava em pasta temporária e troca de uma vez (evita base pela metade em caso de erro)
+    tmp = CAMINHO_BASE_PARQUET + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    pq.write_to_dataset(tabela, root_path=tmp, partition_cols=["competencia"])
+    shutil.rmtree(CAMINHO_BASE_PARQUET, ignore_errors=True)
+    os.replace(tmp, CAMINHO_BASE_PARQUET)
+
+def _garantir_base_parquet():
+    """
+    Na primeira execução após a mudança para Parquet, migra a aba db_ambulatorio
+    do dbProducao.xlsx para o dataset (uma única vez).
+    """
+    if os.path.exists(CAMINHO_BASE_PARQUET) or not os.path.exists(CAMINHO_BASE):
+        return
+    try:
+        df = _ler_aba_xlsx(CAMINHO_BASE, NOME_ABA)
+    except Exception:
+        return
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    if df.empty:
+        return
+    _gravar_base_parquet(df)
+    print(f"📦 Base '{NOME_ABA}' migrada para Parquet em '{CAMINHO_BASE_PARQUET}' ({len(df)} linhas).")
+
+def _assinatura_base() -> tuple:
+    """
+    Identifica a versão atual do dataset Parquet (nº de arquivos + mtime mais recente).
+    Muda sempre que algo é acrescentado ou regravado na base.
+    """
+    n, ultimo = 0, 0
+    for raiz, _dirs, arquivos in os.walk(CAMINHO_BASE_PARQUET):
+        for nome in arquivos:
+            n += 1
+            ultimo = max(ultimo, os.stat(os.path.join(raiz, nome)).st_mtime_ns)
+    return n, ultimo
+
+@functools.lru_cache(maxsize=8)
+def _ler_base_cached(colunas: tuple, assinatura: tuple) -> pd.DataFrame:
+    """Leitura do Parquet em cache por versão do dataset (ver _assinatura_base)."""
+    df = pd.read_parquet(CAMINHO_BASE_PARQUET, columns=list(colunas))
+    if "competencia" in df.columns:
+        # a coluna de partição volta como categoria; devolve como texto
+        df["competencia"] = df["competencia"].astype(str)
+    return df[list(colunas)]
+
+def ler_base_ambulatorio(colunas=None):
+    """
+    Lê a base de atendimentos do Parquet (somente as colunas pedidas, se informadas).
+    Retorna DataFrame vazio com as colunas esperadas se a base ainda não existir.
+    Leituras repetidas sem alteração na base vêm do cache (sempre como cópia).
+    """
+    _garantir_base_parquet()
+    colunas = tuple(colunas or _BASE_COLS)
+    if not os.path.exists(CAMINHO_BASE_PARQUET):
+        return pd.DataFrame(columns=list(colunas))
+    return _ler_base_cached(colunas, _assinatura_base()).copy()
+
+def exportar_base_xlsx(forcar=False):
+    """
+    Regrava a aba db_ambulatorio do dbProducao.xlsx a partir do Parquet.
+    Só roda quando houve inserção desde a última exportação (ou com forcar=True).
+    A pendência só é baixada depois que o arquivo foi de fato salvo (dentro de um
+    lote, isso é no fim do lote).
+    """
+    if not (_BASE_XLSX_PENDENTE or forcar):
+        return
+    try:
+        if not forcar and _acrescentar_base_xlsx():
+            n = sum(len(d) for d in _BASE_XLSX_NOVAS)
+            print(f"📤 {n} linha(s) acrescentada(s) à aba '{NOME_ABA}' de '{CAMINHO_BASE}'.")
+        else:
+            df = ler_base_ambulatorio()
+            _substituir_aba_openpyxl(CAMINHO_BASE, NOME_ABA, df)
+            print(f"📤 '{NOME_ABA}' exportada para '{CAMINHO_BASE}' ({len(df)} linhas).")
+        exportados = len(_BASE_XLSX_NOVAS)
+
+        def _baixar_pendencia():
+            global _BASE_XLSX_PENDENTE
+            # o que entrou depois desta exportação continua pendente
+            del _BASE_XLSX_NOVAS[:exportados]
+            _BASE_XLSX_PENDENTE = bool(_BASE_XLSX_NOVAS)
+
+        _apos_gravar(CAMINHO_BASE, _baixar_pendencia)
+    except Exception as e:
+        print(f"❌ Erro ao exportar '{NOME_ABA}' para o Excel: {e}")
+
+def _acrescentar_base_xlsx():
+    """
+    Acrescenta ao fim da aba db_ambulatorio só as linhas inseridas desde a última
+    exportação (ws.append), sem reler nem regravar as linhas que já estão lá.
+    Retorna False quando a aba não está em condição de receber o acréscimo
+    (arquivo/aba inexistente, cabeçalho diferente ou nº de linhas fora de sincronia
+    com o Parquet); nesse caso quem chamou faz a exportação completa.
+    A conferência abre o arquivo em read_only (só cabeçalho e dimensão); o acréscimo
+    em si vai para a fila do arquivo quando há um lote aberto.
+    """
+    if not _BASE_XLSX_NOVAS or not os.path.exists(CAMINHO_BASE):
+        return False
+    if _ABAS_ADIADAS is not None and NOME_ABA in _ABAS_ADIADAS.get(CAMINHO_BASE, {}):
+        return False  # a aba já tem gravação na fila: o disco não reflete mais o estado dela
+    wb = load_workbook(CAMINHO_BASE, read_only=True)
+    try:
+        if NOME_ABA not in wb.sheetnames:
+            return False
+        ws = wb[NOME_ABA]
+        cabecalho = [c.value for c in next(ws.iter_rows(max_row=1), ())]
+        total = ws.max_row  # da dimensão gravada no XML; sem ela, conta as linhas em streaming
+        if total is None:
+            total = sum(1 for _ in ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+    if [str(c).strip().lower() for c in cabecalho] != _BASE_COLS:
+        return False
+    novas = sum(len(d) for d in _BASE_XLSX_NOVAS)
+    if total - 1 + novas != len(ler_base_ambulatorio(["cnes"])):
+        return False
+    registros = [
+        dict(zip(cabecalho, linha))
+        for df in _BASE_XLSX_NOVAS
+        for linha in df.itertuples(index=False, name=None)
+    ]
+    _gravar_ou_adiar(CAMINHO_BASE, NOME_ABA, ("acrescentar", registros))
+    return True
+
 def carregar_base_existente():
     """
-    Carrega os dados existentes da aba db_ambulatorio.
+    Carrega os dados existentes da base de atendimentos (Parquet),
+    apenas com as colunas usadas na detecção de duplicatas.
     """
     try:
-        df_existente = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA, engine="openpyxl")
-        df_existente.columns = [col.strip().lower() for col in df_existente.columns]
+        df_existente = ler_base_ambulatorio(_CHAVE_BASE)
     except Exception:
-        print("⚠️ Arquivo base não encontrado. Criando nova base.")
-        df_existente = pd.DataFrame(columns=[
-            "cnes", "competencia",
-            "especialidade_original",   # nova
-            "especialidade",            # final
-            "quantitativo de atendimentos"
-        ])
+        print("⚠️ Base não encontrada ou ilegível. Criando nova base.")
+        df_existente = pd.DataFrame(columns=_CHAVE_BASE)
     return df_existente
 
+def _chave_concatenada(df):
+    """Junta as colunas da chave em um único texto por linha ('|' como separador)."""
+    partes = [df[col].astype(str).str.strip() for col in df.columns]
+    if not partes:
+        return pd.Series([], dtype=str)
+    chave = partes[0]
+    for parte in partes[1:]:
+        chave = chave + "|" + parte
+    return chave
+
 def remover_duplicatas(df_novo, df_existente):
     """
     Evita duplicação de linhas já existentes, comparando por CNES + competência + especialidade + quantitativo.
@@ -1847,21 +2816,23 @@ def remover_duplicatas(df_novo, df_existente):
     """
     chave = ["cnes", "competencia", "especialidade", "quantitativo de atendimentos"]
 
-    # Normaliza os campos para comparação
+    # Normaliza os campos das linhas novas para comparação
     for col in chave:
         df_novo[col] = df_novo[col].astype(str).str.strip().str.lower()
-        df_existente[col] = df_existente[col].astype(str).str.strip().str.lower()
 
-    # Junta os novos com os existentes
-    df_merged = df_novo.merge(df_existente[chave], on=chave, how="left", indicator=True)
-    df_novos = df_merged[df_merged["_merge"] == "left_only"].drop(columns=["_merge"])
+    # Na base, normaliza só as combinações distintas (sem alterar o DataFrame recebido)
+    # e guarda a chave concatenada num set: pertinência O(1) por linha, sem merge/indicador
+    existentes = df_existente[chave].drop_duplicates()
+    chaves_existentes = set(_chave_concatenada(existentes).str.strip().str.lower())
+    ja_existe = _chave_concatenada(df_novo[chave]).isin(chaves_existentes).to_numpy()
+    df_novos = df_novo[~ja_existe].reset_index(drop=True)
 
     # Duplicatas removidas
-    duplicatas = df_merged[df_merged["_merge"] == "both"]
+    duplicatas = df_novo[ja_existe]
     if not duplicatas.empty:
         print(f"🚫 {len(duplicatas)} linha(s) duplicada(s) foram identificadas e **removidas**:")
-        for _, row in duplicatas.iterrows():
-            print(f"   → {row['cnes']} | {row['competencia']} | {row['especialidade']} | {row['quantitativo de atendimentos']}")
+        for cnes, competencia, especialidade, qtd in duplicatas[chave].itertuples(index=False, name=None):
+            print(f"   → {cnes} | {competencia} | {especialidade} | {qtd}")
 
     return df_novos
 
@@ -1869,120 +2840,307 @@ def inserir_novos_dados(df_novos):
     """
     Insere os novos dados limpos na aba db_ambulatorio, mantendo capitalização padronizada.
     """
+    global _BASE_XLSX_PENDENTE
     if df_novos.empty:
         print("✅ Nenhum novo dado para inserir.")
         return
 
     print(f"🟢 Inserindo {len(df_novos)} novas linhas na base '{NOME_ABA}'.")
 
-    try:
-        # Tenta carregar a base antiga
-        df_antigo = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA, engine="openpyxl")
-        df_antigo.columns = [col.strip().lower() for col in df_antigo.columns]
-    except Exception:
-        print("⚠️ Base existente não encontrada ou com erro. Criando nova.")
-        df_antigo = pd.DataFrame(columns=[
-            "cnes", "competencia",
-            "especialidade_original",
-            "especialidade",
-            "quantitativo de atendimentos"
-        ])
-
-
-    # Junta os dados antigos com os novos
-    df_novo_total = pd.concat([df_antigo, df_novos], ignore_index=True)
+    # Migra a base antiga (xlsx) antes do primeiro acréscimo
+    _garantir_base_parquet()
 
     # Normaliza capitalização das especialidades para visualização mais limpa
-    df_novo_total["especialidade"] = df_novo_total["especialidade"].astype(str).str.title()
+    df_novos = df_novos.copy()
+    df_novos["especialidade"] = df_novos["especialidade"].astype(str).str.title()
 
-    # Salva no Excel preservando outras abas
+    # Acrescenta somente as linhas novas (não relê nem regrava a base inteira)
     try:
-        # Se o arquivo ainda não existir, cria com essa aba
-        if not os.path.exists(CAMINHO_BASE):
-            print("📁 Arquivo base não encontrado. Criando um novo com a aba db_ambulatorio.")
-            with pd.ExcelWriter(CAMINHO_BASE, engine="openpyxl") as writer:
-                df_novo_total.to_excel(writer, sheet_name=NOME_ABA, index=False)
-        else:
-            with pd.ExcelWriter(CAMINHO_BASE, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                df_novo_total.to_excel(writer, sheet_name=NOME_ABA, index=False)
+        _gravar_base_parquet(df_novos)
     except Exception as e:
         print(f"❌ Erro ao salvar dados em '{NOME_ABA}': {e}")
+        return
 
-    print("✅ Base atualizada com sucesso, mantendo demais abas intactas.")
+    _BASE_XLSX_PENDENTE = True
+    _BASE_XLSX_NOVAS.append(_preparar_para_parquet(df_novos))
+    print("✅ Base atualizada com sucesso (Parquet); o Excel é exportado ao final do processamento.")
 
 # ===============================================================
 # LOGS E REGISTROS DE ERROS
 # ===============================================================
 
-def registrar_erros_ambulatorio(linhas_invalidas):
+def _preparar_tabela_parquet(df):
     """
-    Registra erros **apenas** no arquivo de logs central:
-      Controle/Log de Erros.xlsx → aba: 'ambulatorio_log'
-    (não escreve nada em dbProducao.xlsx)
+    Fixa o schema de uma tabela de controle/log antes de gravar: colunas de contagem
+    como inteiro (aceita vazio) e todas as demais como texto. Assim os arquivos
+    gravados em momentos diferentes (ex.: cnes número no Excel antigo, texto nos
+    registros novos) podem ser lidos juntos.
     """
-    if not linhas_invalidas:
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if col in _COLS_NUMERICAS_CONTROLE:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        else:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype("string")
+    return df
+
+def _novo_arquivo_parte(pasta):
+    """Caminho de um novo arquivo do dataset; o nome ordena pela hora de gravação."""
+    return os.path.join(pasta, f"part-{time.time_ns():020d}.parquet")
+
+def _garantir_tabela_controle(caminho_pq):
+    """
+    Na primeira vez, se só existir o .xlsx antigo, migra a aba correspondente
+    para o dataset Parquet (como o primeiro arquivo da pasta).
+    """
+    if os.path.exists(caminho_pq):
+        return
+    caminho_xlsx, aba = _TABELAS_CONTROLE[caminho_pq]
+    df = _ler_aba_xlsx(caminho_xlsx, aba)  # arquivo ou aba inexistente → vazio
+    if df.empty and df.columns.empty:
         return
+    os.makedirs(caminho_pq, exist_ok=True)
+    _preparar_tabela_parquet(df).to_parquet(_novo_arquivo_parte(caminho_pq), index=False)
 
-    print(f"📝 Registrando {len(linhas_invalidas)} erros em 'ambulatorio_log' (arquivo de LOG).")
+def ler_tabela_controle(caminho_pq):
+    """
+    Lê uma tabela de controle/log (pasta de arquivos Parquet, na ordem de gravação).
+    Levanta FileNotFoundError se a tabela ainda não existir em nenhum dos formatos.
+    Releituras sem alteração na tabela vêm do cache (sempre como cópia).
+    """
+    _garantir_tabela_controle(caminho_pq)
+    if not os.path.exists(caminho_pq):
+        raise FileNotFoundError(caminho_pq)
+    partes = tuple(sorted(f for f in os.listdir(caminho_pq) if f.endswith(".parquet")))
+    if not partes:
+        return pd.DataFrame()
+    return _ler_partes_cached(caminho_pq, partes).copy()
 
-    os.makedirs(CONTROLE_DIR, exist_ok=True)
+@functools.lru_cache(maxsize=8)
+def _ler_partes_cached(caminho_pq: str, partes: tuple) -> pd.DataFrame:
+    """
+    Leitura das partes de uma tabela de controle, em cache na sessão.
+    Os nomes das partes levam a hora de gravação (ns), então a tupla de nomes
+    identifica a versão: qualquer acréscimo ou regravação muda a chave e força a releitura.
+    """
+    # Lidos um a um: registros novos podem trazer colunas que as partes antigas não têm
+    dfs = [pd.read_parquet(os.path.join(caminho_pq, f)) for f in partes]
+    return pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else dfs[0]
+
+def acrescentar_tabela_controle(caminho_pq, df_novo):
+    """
+    Acrescenta linhas a uma tabela que só cresce (log, mudanças): grava só as linhas
+    novas como mais um arquivo da pasta, sem ler nem copiar o que já está gravado.
+    """
+    _garantir_tabela_controle(caminho_pq)
+    os.makedirs(caminho_pq, exist_ok=True)
+    _preparar_tabela_parquet(df_novo).to_parquet(_novo_arquivo_parte(caminho_pq), index=False)
+    _TABELAS_PENDENTES.add(caminho_pq)
 
-    sheet = "ambulatorio_log"
+def _regravar_partes(caminho_pq, df):
+    """Troca todos os arquivos da tabela por um só (pasta temporária + troca de uma vez)."""
+    tmp = caminho_pq + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    _preparar_tabela_parquet(df).to_parquet(_novo_arquivo_parte(tmp), index=False)
+    shutil.rmtree(caminho_pq, ignore_errors=True)
+    os.replace(tmp, caminho_pq)
+
+def gravar_tabela_controle(caminho_pq, df):
+    """
+    Regrava a tabela inteira (quando linhas são alteradas ou removidas) e marca o
+    .xlsx correspondente para exportação. Grava numa pasta temporária e troca de uma vez.
+    """
+    _regravar_partes(caminho_pq, df)
+    _TABELAS_PENDENTES.add(caminho_pq)
+
+def _compactar_tabela_controle(caminho_pq, df):
+    """
+    Cada acréscimo vira um arquivo novo na pasta da tabela; passando de
+    MAX_PARTES_CONTROLE arquivos, junta tudo num só (df = conteúdo já lido),
+    para as leituras seguintes não abrirem centenas de arquivos pequenos.
+    """
+    partes = [f for f in os.listdir(caminho_pq) if f.endswith(".parquet")]
+    if len(partes) <= MAX_PARTES_CONTROLE:
+        return
     try:
-        df_exist = pd.read_excel(CAMINHO_LOGS, sheet_name=sheet, engine="openpyxl")
-    except Exception:
-        df_exist = pd.DataFrame()
+        _regravar_partes(caminho_pq, df)
+    except Exception as e:
+        print(f"⚠️ Não foi possível compactar '{os.path.basename(caminho_pq)}': {e}")
 
-    df_new = pd.DataFrame(linhas_invalidas)
-    df_out = pd.concat([df_exist, df_new], ignore_index=True)
+def exportar_controles_xlsx(forcar=False):
+    """
+    Gera as abas de Log/Mudanças/Qualificação nos .xlsx a partir dos Parquet.
+    Por padrão só exporta as tabelas alteradas desde a última exportação;
+    com forcar=True (opção do menu) regera todas.
+    """
+    flush_logs()
+    for caminho_pq, (caminho_xlsx, aba) in _TABELAS_CONTROLE.items():
+        if not (forcar or caminho_pq in _TABELAS_PENDENTES):
+            continue
+        if not os.path.exists(caminho_pq):
+            continue
+        try:
+            df = ler_tabela_controle(caminho_pq)
+            _salvar_aba_controle(caminho_xlsx, aba, _quantitativo_numerico_xlsx(df))
+            _TABELAS_PENDENTES.discard(caminho_pq)
+            _compactar_tabela_controle(caminho_pq, df)  # aproveita a leitura da exportação
+            print(f"📤 '{aba}' exportada para '{os.path.basename(caminho_xlsx)}'.")
+        except Exception as e:
+            print(f"❌ Erro ao exportar '{aba}' para o Excel: {e}")
 
-    with pd.ExcelWriter(CAMINHO_LOGS, engine="openpyxl",
-                        mode=("a" if os.path.exists(CAMINHO_LOGS) else "w"),
-                        if_sheet_exists=("replace" if os.path.exists(CAMINHO_LOGS) else None)) as w:
-        df_out.to_excel(w, sheet_name=sheet, index=False)
+def _quantitativo_numerico_xlsx(df):
+    """
+    No Excel, o "quantitativo" (texto no Parquet) que for número volta a ser célula
+    numérica; o que não for número sai como o texto original.
+    """
+    if "quantitativo" not in df.columns:
+        return df
+    num = pd.to_numeric(df["quantitativo"], errors="coerce")
+    return df.assign(quantitativo=num.astype(object).where(num.notna(), df["quantitativo"]))
+
+def _salvar_aba_controle(caminho, aba, df):
+    """
+    Regrava um arquivo de controle/log trocando apenas o conteúdo da aba `aba`.
+    As demais abas são lidas uma única vez (somente valores) e todo o arquivo é
+    reescrito com xlsxwriter, que gera o XML direto, sem montar o modelo de
+    células do openpyxl a cada gravação.
+    """
+    abas = {}
+    if os.path.exists(caminho):
+        abas = pd.read_excel(caminho, sheet_name=None, engine=READ_ENGINE)
+    abas[aba] = df
+
+    # constant_memory: cada linha vai para o disco assim que é escrita
+    opcoes = {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"}
+    with pd.ExcelWriter(caminho, engine="xlsxwriter", engine_kwargs={"options": opcoes}) as w:
+        # mesmo estilo de cabeçalho que o to_excel usa
+        fmt_cab = w.book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        for nome, df_aba in abas.items():
+            _escrever_aba_xlsxwriter(w.book, nome, df_aba, fmt_cab)
+
+def _escrever_aba_xlsxwriter(book, nome, df, fmt_cab):
+    """Escreve o DataFrame linha a linha (write_row), sem passar pelo to_excel/formatador do pandas."""
+    ws = book.add_worksheet(nome)
+    ws.write_row(0, 0, [str(c) for c in df.columns], fmt_cab)
+    for i, linha in enumerate(df.itertuples(index=False, name=None), start=1):
+        # vazio (NaN/NA/NaT) vira célula em branco
+        ws.write_row(i, 0, [None if pd.isna(v) else v for v in linha])
 
-    print("✅ Log de erros atualizado em 'Log de Erros.xlsx'.")
+def registrar_erros_ambulatorio(linhas_invalidas):
+    """
+    Registra erros **apenas** no arquivo de logs central:
+      Controle/Log de Erros.xlsx → aba: 'ambulatorio_log'
+    (não escreve nada em dbProducao.xlsx)
+    As linhas ficam em memória e são gravadas de uma vez em flush_logs().
+    """
+    if not linhas_invalidas:
+        return
+
+    print(f"📝 Registrando {len(linhas_invalidas)} erros em 'ambulatorio_log' (arquivo de LOG).")
+    _PENDING_ERROS.extend(linhas_invalidas)
 
 def registrar_mudancas_e_registros(registro: dict):
     """
     Grava todas as decisões manuais (mudanças + registros) em:
       Controle/Controle de Mudanças e Registros.xlsx → aba: 'Ambulatório'
     Usa superset de colunas; o que não vier no dict fica vazio.
+    O registro fica em memória e é gravado em flush_logs().
+    """
+    _PENDING_MUD_REG.append(registro)
+
+def _gravar_qualificacao_pendente():
+    """
+    Junta as linhas de Qualificação acumuladas à tabela numa única concatenação.
+    Uma linha do mesmo (arquivo, competencia) já gravada é substituída no lugar,
+    localizada por um índice em dict (sem montar máscaras sobre a tabela toda).
+    Retorna False, sem gravar nada, se nenhuma linha mudou.
     """
+    garantir_quali_dados()
     try:
-        os.makedirs(CONTROLE_DIR, exist_ok=True)
+        df_exist = ler_tabela_controle(CAMINHO_QUALI_PARQUET).reset_index(drop=True)
+    except Exception:
+        df_exist = pd.DataFrame()
+
+    # (arquivo, competencia) -> posição da linha já gravada
+    indice = {}
+    if not df_exist.empty and all(c in df_exist.columns for c in ["arquivo", "competencia"]):
+        chaves = zip(df_exist["arquivo"].astype(str), df_exist["competencia"].astype(str))
+        indice = {chave: i for i, chave in enumerate(chaves)}
+
+    novas = {}
+    alterou = False
+    for linha in _PENDING_QUALI:
+        chave = (str(linha["arquivo"]), str(linha["competencia"]))
+        if chave in indice:
+            if _linha_quali_igual(df_exist.loc[indice[chave]], linha):
+                continue  # reprocessamento sem mudança: mantém a linha (e a data) já gravada
+            df_exist.loc[indice[chave], list(linha)] = list(linha.values())
+            alterou = True
+        else:
+            novas[chave] = linha  # repetida na mesma sessão → vale a última
+
+    if not (alterou or novas):
+        return False  # nada mudou: não regrava a tabela nem o .xlsx
+    df_out = pd.concat([df_exist, pd.DataFrame(list(novas.values()))], ignore_index=True) if novas else df_exist
+    gravar_tabela_controle(CAMINHO_QUALI_PARQUET, df_out)
+    return True
+
+def _linha_quali_igual(existente, nova: dict) -> bool:
+    """Compara uma linha gravada com uma nova, ignorando a Data_Registro (sempre muda)."""
+    for col, v in nova.items():
+        if col == "Data_Registro":
+            continue
+        atual = existente.get(col)
+        if pd.isna(atual) and pd.isna(v):
+            continue
+        if pd.isna(atual) or pd.isna(v) or str(atual) != str(v):
+            return False
+    return True
 
+def flush_logs():
+    """
+    Grava os erros, as mudanças/registros e a Qualificação acumulados desde o último
+    flush. Log e mudanças só crescem: vai para o disco apenas o que é novo.
+    A pasta Controle já é criada na importação do módulo.
+    """
+    if _PENDING_ERROS:
         try:
-            df_exist = pd.read_excel(CAMINHO_CONTROLE_MUD_REG, sheet_name=ABA_MUD_REG, engine="openpyxl")
-        except Exception:
-            df_exist = pd.DataFrame()
+            acrescentar_tabela_controle(CAMINHO_LOGS_PARQUET, pd.DataFrame(_PENDING_ERROS))
+            print(f"✅ Log de erros atualizado ({len(_PENDING_ERROS)} linha(s)).")
+            _PENDING_ERROS.clear()
+        except Exception as e:
+            print(f"❌ Erro ao salvar o log de erros: {e}")
 
-        df_new = pd.DataFrame([registro])
-        df_out = pd.concat([df_exist, df_new], ignore_index=True)
+    if _PENDING_MUD_REG:
+        try:
+            acrescentar_tabela_controle(CAMINHO_MUD_REG_PARQUET, pd.DataFrame(_PENDING_MUD_REG))
+            print(f"🗂️ {len(_PENDING_MUD_REG)} Mudança(s)/Registro(s) salvos (aba '{ABA_MUD_REG}').")
+            _PENDING_MUD_REG.clear()
+        except Exception as e:
+            print(f"❌ Erro ao salvar em 'Controle de Mudanças e Registros': {e}")
 
-        with pd.ExcelWriter(CAMINHO_CONTROLE_MUD_REG, engine="openpyxl",
-                            mode=("a" if os.path.exists(CAMINHO_CONTROLE_MUD_REG) else "w"),
-                            if_sheet_exists=("replace" if os.path.exists(CAMINHO_CONTROLE_MUD_REG) else None)) as w:
-            df_out.to_excel(w, sheet_name=ABA_MUD_REG, index=False)
+    if _PENDING_QUALI:
+        try:
+            if _gravar_qualificacao_pendente():
+                print(f"🧪 Qualificação atualizada em '{CAMINHO_QUALI_DADOS}' (aba '{ABA_QUALI_AMB}').")
+            else:
+                print("🧪 Qualificação sem alterações (nada regravado).")
+            _PENDING_QUALI.clear()
+        except Exception as e:
+            print(f"❌ Erro ao salvar Qualificação: {e}")
 
-        print(f"🗂️ Mudanças/Registros salvos em '{CAMINHO_CONTROLE_MUD_REG}' (aba '{ABA_MUD_REG}').")
-    except Exception as e:
-        print(f"❌ Erro ao salvar em 'Controle de Mudanças e Registros': {e}")
+# Rede de segurança: nada acumulado se perde se o programa terminar no meio de uma ação
+atexit.register(flush_logs)
 
 def registrar_controle_resumo(resumo: dict):
     """
     Grava Qualificação (linhas/somas + 2 status) em:
       Controle/Qualificação de Dados.xlsx → aba: 'Ambulatorio'
+    A linha fica em memória; flush_logs() junta todas à tabela de uma vez.
     """
     try:
-        os.makedirs(CONTROLE_DIR, exist_ok=True)
-        garantir_quali_dados()
-
-        try:
-            df_exist = pd.read_excel(CAMINHO_QUALI_DADOS, sheet_name=ABA_QUALI_AMB, engine="openpyxl")
-        except Exception:
-            df_exist = pd.DataFrame()
-
         raw_linhas  = int(resumo.get("n° de linhas raw", 0) or 0)
         base_linhas = int(resumo.get("n° de linhas base", 0) or 0)
         erro_linhas = int(resumo.get("n° de linhas erros", 0) or 0)
@@ -2002,7 +3160,7 @@ def registrar_controle_resumo(resumo: dict):
 
         status_soma = "OK" if raw_soma == (base_soma + erro_soma) else "Divergente"
 
-        df_new = pd.DataFrame([{
+        _PENDING_QUALI.append({
             "Data_Registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "arquivo":       resumo.get("arquivo"),
             "cnes":          str(resumo.get("cnes", "")).strip(),
@@ -2016,48 +3174,93 @@ def registrar_controle_resumo(resumo: dict):
             "soma_base":     base_soma,
             "soma_logs":     erro_soma,
             "status_soma":   status_soma
-        }])
-
-        # Dedup (arquivo, competencia)
-        if not df_exist.empty and all(c in df_exist.columns for c in ["arquivo","competencia"]):
-            mask_dup = (df_exist["arquivo"] == df_new.iloc[0]["arquivo"]) & \
-                       (df_exist["competencia"] == df_new.iloc[0]["competencia"])
-            df_exist = df_exist[~mask_dup]
-
-        df_out = pd.concat([df_exist, df_new], ignore_index=True)
+        })
+    except Exception as e:
+        print(f"❌ Erro ao registrar Qualificação: {e}")
 
-        with pd.ExcelWriter(CAMINHO_QUALI_DADOS, engine="openpyxl",
-                            mode="a", if_sheet_exists="replace") as w:
-            df_out.to_excel(w, sheet_name=ABA_QUALI_AMB, index=False)
 
-        print(f"🧪 Qualificação atualizada em '{CAMINHO_QUALI_DADOS}' (aba '{ABA_QUALI_AMB}').")
+def _mover_um_arquivo(nome):
+    """Move uma planilha para 'Arquivadas' e devolve a mensagem do resultado."""
+    origem = os.path.join(CAMINHO_PLANILHAS, nome)
+    destino = os.path.join(CAMINHO_ARQUIVADAS, nome)
+    try:
+        try:
+            os.replace(origem, destino)  # mesma unidade: só renomeia
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(origem, destino)  # outra unidade: copia e apaga
+        return f"📦 Arquivo '{nome}' movido para 'Arquivadas'."
     except Exception as e:
-        print(f"❌ Erro ao salvar Qualificação: {e}")
-
+        return f"❌ Erro ao mover '{nome}': {e}"
 
 def mover_arquivos_processados(lista_arquivos):
     """
-    Move planilhas processadas para a pasta de arquivamento
+    Move planilhas processadas para a pasta de arquivamento.
+    As movimentações são só I/O (muitas vezes em pasta de rede), então rodam em threads;
+    as mensagens saem na ordem da lista.
     """
-    for nome in lista_arquivos:
-        origem = os.path.join(CAMINHO_PLANILHAS, nome)
-        destino = os.path.join(CAMINHO_ARQUIVADAS, nome)
-        try:
-            shutil.move(origem, destino)
-            print(f"📦 Arquivo '{nome}' movido para 'Arquivadas'.")
-        except Exception as e:
-            print(f"❌ Erro ao mover '{nome}': {e}")
+    if not lista_arquivos:
+        return
+    with ThreadPoolExecutor(max_workers=min(8, len(lista_arquivos))) as ex:
+        for msg in ex.map(_mover_um_arquivo, lista_arquivos):
+            print(msg)
 
 # ===============================================================
 # CONTROLE DE ENVIO DE PLANILHAS (por hospital e mês)
 # ===============================================================
 
-def atualizar_aba_controle():
+def _marcador_envio(meses) -> dict:
+    """Versão das entradas da aba Envio: dataset da base, dHospitais e janela de meses."""
+    return {
+        "base": list(_assinatura_base()),
+        "dhospitais": os.path.getmtime(CAMINHO_DHOSPITAIS),
+        "meses": list(meses),
+    }
+
+def _ler_marcador_envio():
+    try:
+        with open(CAMINHO_MARCADOR_ENVIO, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _gravar_marcador_envio(marcador: dict):
+    """Grava o marcador (.tmp + os.replace, como a config)."""
+    try:
+        tmp = CAMINHO_MARCADOR_ENVIO + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(marcador, f)
+        os.replace(tmp, CAMINHO_MARCADOR_ENVIO)
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o marcador da aba '{ABA_ENVIO}': {e}")
+
+def _apagar_marcador_envio():
+    """Sem marcador, a próxima execução refaz a aba Envio (usado quando a gravação falha)."""
+    try:
+        os.remove(CAMINHO_MARCADOR_ENVIO)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ Não foi possível apagar o marcador da aba '{ABA_ENVIO}': {e}")
+
+def _aba_envio_existe() -> bool:
+    """A aba Envio está no arquivo (ou na fila de gravações do lote atual)?"""
+    if _ABAS_ADIADAS is not None and ABA_ENVIO in _ABAS_ADIADAS.get(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, {}):
+        return True
+    try:
+        mtime = os.path.getmtime(CAMINHO_CONTROLE_ATUALIZACAO_GRADE)
+        return ABA_ENVIO in _abas_xlsx_cached(CAMINHO_CONTROLE_ATUALIZACAO_GRADE, mtime)
+    except Exception:
+        return False
+
+def atualizar_aba_controle(df_base=None):
     """
     Cria ou atualiza a aba 'controle_ambulatorio' mostrando,
     para os últimos 6 meses, quais hospitais enviaram planilhas
     e quais ainda não enviaram.
     Agora lê os hospitais diretamente do arquivo dHospitais.xlsx.
+    df_base: base já em memória (precisa de cnes/competencia); se None, lê do Parquet.
     """
     try:
         # ✅ Carrega base de hospitais
@@ -2065,53 +3268,61 @@ def atualizar_aba_controle():
             print(f"⚠️ Arquivo dHospitais.xlsx não encontrado em: {CAMINHO_DHOSPITAIS}")
             return
 
-        xls = pd.ExcelFile(CAMINHO_DHOSPITAIS, engine="openpyxl")
-        aba = "hospitais" if "hospitais" in [s.lower() for s in xls.sheet_names] else xls.sheet_names[0]
-        df_hospitais = pd.read_excel(xls, sheet_name=aba, engine="openpyxl")
+        # ✅ Gera lista dos últimos 6 meses (exclui mês atual)
+        mes_passado = pd.Timestamp.today().to_period("M") - 1
+        meses = pd.period_range(end=mes_passado, periods=6, freq="M").strftime("%Y-%m").tolist()
+
+        # Nada mudou desde a última gravação (base, hospitais e janela de meses): não refaz
+        marcador = _marcador_envio(meses)
+        if marcador == _ler_marcador_envio() and _aba_envio_existe():
+            print(f"ℹ️ Aba '{ABA_ENVIO}' já está atualizada (sem alterações na base).")
+            return
 
-        # assume CNES na primeira coluna (A) e Nome do hospital na quarta (D)
-        df_hospitais = df_hospitais.iloc[:, [0, 3]].copy()
+        # em cache enquanto o arquivo não mudar; já só CNES (col A) e Nome (col D)
+        df_hospitais = _ler_dhospitais()
         df_hospitais.columns = ["cnes", "nome_hospital"]
-        df_hospitais["cnes"] = df_hospitais["cnes"].astype(str).str.strip()
+        df_hospitais["cnes"] = df_hospitais["cnes"].astype("string").str.strip()
 
-        # ✅ Carrega base já processada (dbProducao.xlsx)
-        df_base = pd.read_excel(CAMINHO_BASE, sheet_name=NOME_ABA, engine="openpyxl")
-        df_base["cnes"] = df_base["cnes"].astype(str)
+        # cnes como categoria com o mesmo dicionário dos dois lados:
+        # filtros, pivot e merge passam a comparar códigos inteiros, não strings
+        tipo_cnes = pd.CategoricalDtype(df_hospitais["cnes"].dropna().unique())
+        df_hospitais["cnes"] = df_hospitais["cnes"].astype(tipo_cnes)
 
-        # ✅ Gera lista dos últimos 6 meses (exclui mês atual)
-        hoje = datetime.today().replace(day=1)
-        meses = [(hoje - relativedelta(months=i)).strftime("%Y-%m") for i in range(1, 7)]
-        meses.reverse()
-
-        # ✅ Cria tabela de controle
-        df_controle = df_hospitais.copy()
-        for mes in meses:
-            col_mes = []
-            for cnes in df_controle["cnes"]:
-                enviado = not df_base[
-                    (df_base["cnes"] == cnes) &
-                    (df_base["competencia"] == mes)
-                ].empty
-                col_mes.append("✅" if enviado else "❌")
-            df_controle[mes] = col_mes
+        # ✅ Carrega base já processada (Parquet; só as colunas usadas aqui).
+        # O cnes já é gravado como texto sem espaços (_preparar_para_parquet).
+        if df_base is None:
+            df_base = ler_base_ambulatorio(["cnes", "competencia"])
+        else:
+            df_base = df_base[["cnes", "competencia"]].astype(str)
+        df_base["cnes"] = df_base["cnes"].astype(tipo_cnes)  # fora de dHospitais → vazio
+
+        # ✅ Cria tabela de controle: um pivot (cnes x mês) com o que foi enviado
+        enviados = (
+            df_base[df_base["competencia"].isin(meses) & df_base["cnes"].notna()]
+            .drop_duplicates(["cnes", "competencia"])
+            .assign(v=True)
+            .pivot(index="cnes", columns="competencia", values="v")
+            .reindex(columns=meses)  # garante todas as colunas de mês, na ordem
+        )
+        df_controle = df_hospitais.merge(enviados, left_on="cnes", right_index=True, how="left")
+
+        # Matriz booleana (hospital x mês); os textos ✅/❌ só entram no último passo, antes de gravar
+        enviado = df_controle[meses].notna().to_numpy()
+        df_controle[meses] = np.where(enviado, "✅", "❌")
 
         # ✅ Salva na aba controle_ambulatorio
         DESTINO_ENVIO = CAMINHO_CONTROLE_ATUALIZACAO_GRADE  # \\...\\Produção Hospitalar\\Controle\\Controle de Atualização.xlsx
-        NOME_ABA_ENVIO = "Ambulatorial – Envio (6 meses)"    # evita conflito com "Ambulatorial – Grade"
 
-        with pd.ExcelWriter(
-            DESTINO_ENVIO,
-            engine="openpyxl",
-            mode=("a" if os.path.exists(DESTINO_ENVIO) else "w"),
-            if_sheet_exists=("replace" if os.path.exists(DESTINO_ENVIO) else None)
-        ) as writer:
-            df_controle.to_excel(writer, sheet_name=NOME_ABA_ENVIO, index=False)
+        # O marcador só vale depois que a aba estiver de fato salva (no fim do lote, se houver)
+        _substituir_aba_openpyxl(DESTINO_ENVIO, ABA_ENVIO, df_controle)
+        _apos_gravar(DESTINO_ENVIO, lambda: _gravar_marcador_envio(marcador), _apagar_marcador_envio)
 
-        print(f"✅ Aba '{NOME_ABA_ENVIO}' atualizada em '{DESTINO_ENVIO}'.")
+        print(f"✅ Aba '{ABA_ENVIO}' atualizada em '{DESTINO_ENVIO}'.")
 
         print("✅ Aba 'controle_ambulatorio' atualizada com sucesso.")
 
     except Exception as e:
+        _apagar_marcador_envio()
         print(f"❌ Erro ao atualizar controle: {e}")
 
 # ===============================================================
@@ -2128,18 +3339,45 @@ def executar_processamento():
     print("\n✅ Dados lidos e limpos:")
     print(df_dados if not df_dados.empty else "(vazio)")
 
-    if df_dados.empty:
-        print("ℹ️ Nenhum dado foi processado (nada a inserir).")
-    else:
-        # Carrega base existente e insere novos dados
-        df_base = carregar_base_existente()
-        df_para_inserir = remover_duplicatas(df_dados, df_base)
-        inserir_novos_dados(df_para_inserir)
+    # Abas do mesmo arquivo (base + consultórios, Envio + Grade) saem num único salvamento
+    with gravacoes_em_lote() as falhas:
+        if df_dados.empty:
+            print("ℹ️ Nenhum dado foi processado (nada a inserir).")
+        else:
+            # Carrega base existente (uma vez) e insere novos dados
+            df_base = carregar_base_existente()
+            df_para_inserir = remover_duplicatas(df_dados, df_base)
+            inserir_novos_dados(df_para_inserir)
+            df_base = pd.concat([df_base, df_para_inserir[_CHAVE_BASE]], ignore_index=True)
+
+            # Registra erros e atualiza log (a base em memória já inclui o que entrou acima)
+            registrar_erros_ambulatorio(linhas_invalidas)
+            df_do_log = processar_log_de_erros(df_base)
+            df_base = pd.concat([df_base, df_do_log[_CHAVE_BASE]], ignore_index=True)
+
+            # Exporta a base para o Excel uma única vez (após todas as inserções)
+            exportar_base_xlsx()
+            atualizar_aba_controle(df_base)
+
+        # Logs/Mudanças/Qualificação: uma exportação para o Excel ao final da ação
+        exportar_controles_xlsx()
+
+        # Inserir dados de consultórios (db_ambulatorio2) e espelhar erros
+        if consultorios_extraidos:
+            inserir_consultorios(pd.DataFrame(consultorios_extraidos))
+        if erros_consultorios:
+            registrar_erros_consultorios(erros_consultorios)
+        # Reconstrói a grade global (estilo Envio) após todo o processamento
+        try:
+            atualizar_controle_atualizacao_grade()
+        except Exception as e:
+            print(f"❌ Erro ao atualizar grade de controle: {e}")
 
-        # Registra erros e atualiza log
-        registrar_erros_ambulatorio(linhas_invalidas)
-        processar_log_de_erros()
-        atualizar_aba_controle()
+    flush_config()
+    if falhas:
+        # planilhas ficam na pasta de entrada até os arquivos de saída serem gravados
+        print(f"\n❌ {len(falhas)} arquivo(s) não foram gravados; as planilhas lidas não foram movidas.\n")
+        return
 
     # Mover arquivos mesmo se não geraram dados
     if arquivos_lidos:
@@ -2147,18 +3385,6 @@ def executar_processamento():
     else:
         print("ℹ️ Nenhum arquivo foi marcado para arquivamento.")
 
-    # Inserir dados de consultórios (db_ambulatorio2) e espelhar erros
-    if consultorios_extraidos:
-        df_consult = pd.DataFrame(consultorios_extraidos)
-        if not df_consult.empty:
-            inserir_consultorios(df_consult)
-    if erros_consultorios:
-        registrar_erros_consultorios(erros_consultorios)
-    # Reconstrói a grade global (estilo Envio) após todo o processamento
-    try:
-        atualizar_controle_atualizacao_grade()
-    except Exception as e:
-        print(f"❌ Erro ao atualizar grade de controle: {e}")
     print("\n✅ Processamento concluído.\n")
 
 # ===============================================================
@@ -2168,7 +3394,14 @@ def executar_processamento():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Processa planilhas de Ambulatório.")
     parser.add_argument("--config", type=str, default=CONFIG_PATH, help="Caminho do arquivo de configuração JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra cada linha corrigida a partir do log.")
+    parser.add_argument("--no-cache", action="store_true", help="Relê todas as planilhas, sem usar o cache de leitura.")
     args = parser.parse_args()
+    VERBOSE = args.verbose
+    USAR_CACHE_PLANILHAS = not args.no_cache
+
+    if not LXML_DISPONIVEL:
+        print("ℹ️ lxml não instalado: gravações do Excel via openpyxl ficam mais lentas (pip install lxml).")
 
     # Ajusta caminho do config e carrega
     CONFIG_PATH = args.config